@@ -2,49 +2,98 @@
 """
 Route module for the API
 """
-from os import getenv
+from api.v1.settings import Settings
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
+from functools import lru_cache
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from api.v1.auth.auth import Auth
 from api.v1.auth.basic_auth import BasicAuth
-from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.policy import BASIC, PUBLIC, SESSION, endpoint_policies
+from api.v1.auth.session_auth import SessionAuth, session_auth_views
+from api.v1.compression import init_app as init_compression
+from api.v1.json_provider import init_app as init_json
+from api.v1.metrics import REGISTRY
+from api.v1.profiling import ProfilerMiddleware
+from models import base
+from models.user import User
+
+# Settings are read from the environment once, at startup
+settings = Settings.from_env()
+if settings.store_dir != base.STORE_DIR:
+    base.set_store_dir(settings.store_dir)
+    User.load_from_file()
+
+# Per-stage latency of the auth pipeline, exposed on /api/v1/metrics
+REGISTRY.sample_rate = settings.metrics_sample_rate
+for cls, name, stage in (
+        (Auth, "require_auth", "require_auth"),
+        (Auth, "authorization_header", "authorization_header"),
+        (Auth, "session_cookie", "session_cookie"),
+        (Auth, "current_user", "current_user"),
+        (BasicAuth, "current_user", "current_user"),
+        (SessionAuth, "current_user", "current_user"),
+        (base.Base, "search", "model_search"),
+        (base.Base, "get", "model_get"),
+        (User, "is_valid_password", "password_check")):
+    REGISTRY.instrument(cls, name, stage)
 
 app = Flask(__name__)
+init_json(app)
+if settings.compression:
+    init_compression(app, settings.compression_level,
+                     settings.compression_min_size)
+if settings.profile_dir is not None:
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app, settings)
+if settings.trusted_proxies > 0:
+    # Client IP from X-Forwarded-For, as set by the trusted proxies only
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=settings.trusted_proxies)
 app.register_blueprint(app_views)
+app.register_blueprint(session_auth_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 
 auth = None
-AUTH_TYPE = getenv("AUTH_TYPE", None)
+AUTH_TYPE = settings.auth_type
 
 # Check AUTH_TYPE and instantiate the correct class
 if AUTH_TYPE == "session_auth":
-    auth = SessionAuth()
+    auth = SessionAuth(settings)
 elif AUTH_TYPE == "basic_auth":
-    auth = BasicAuth()
+    auth = BasicAuth(settings)
 else:
-    auth = Auth()
+    auth = Auth(settings)
+
+
+@lru_cache(maxsize=4)
+def policies_for(excluded_paths: tuple) -> dict:
+    """ Auth policy of each endpoint, built on the first request once all
+    the routes are registered
+    """
+    return endpoint_policies(app, auth, excluded_paths)
 
 
 @app.before_request
+@REGISTRY.timed("before_request")
 def before_request():
     """ Method to filter requests before they reach their destination """
-    excluded_paths = [
-        '/api/v1/status/',
-        '/api/v1/unauthorized/',
-        '/api/v1/forbidden/',
-        '/api/v1/auth_session/login/'
-    ]
-
     if auth is None:
         return
 
-    if not auth.require_auth(request.path, excluded_paths):
+    policy = policies_for(settings.excluded_paths).get(request.endpoint)
+    if policy is None:
+        # Routes without a policy, or unknown: match the path
+        if not auth.require_auth(request.path, settings.excluded_paths):
+            return
+        policy = (BASIC, SESSION)
+    elif PUBLIC in policy:
         return
 
-    # Check both authorization header and session cookie
-    if (auth.authorization_header(request) is None and
-            auth.session_cookie(request) is None):
+    # Check the authorization header and session cookie the route accepts
+    if not (BASIC in policy and
+            auth.authorization_header(request) is not None) and \
+            not (SESSION in policy and
+                 auth.session_cookie(request) is not None):
         abort(401)
 
     if auth.current_user(request) is None:
@@ -69,7 +118,15 @@ def forbidden(error) -> str:
     return jsonify({"error": "Forbidden"}), 403
 
 
+@app.errorhandler(429)
+def too_many_requests(error) -> str:
+    """ Too many requests handler """
+    headers = {}
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        headers["Retry-After"] = str(retry_after)
+    return jsonify({"error": "Too many requests"}), 429, headers
+
+
 if __name__ == "__main__":
-    host = getenv("API_HOST", "0.0.0.0")
-    port = getenv("API_PORT", "5000")
-    app.run(host=host, port=port)
+    app.run(host=settings.host, port=settings.port)
@@ -3,12 +3,21 @@
 
 from flask import request
 from typing import List, TypeVar
-import os
+from api.v1.auth.rate_limit import RateLimitExceeded, build_rate_limiter
+from api.v1.settings import Settings
 
 
 class Auth:
     """ Class to manage API authentication """
 
+    def __init__(self, settings: Settings = None):
+        """ Initialize with the API settings, built from the environment
+        when none are given """
+        if settings is None:
+            settings = Settings.from_env()
+        self.settings = settings
+        self.rate_limiter = build_rate_limiter(settings)
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """ Returns True if the path requires authentication """
         if path is None:
@@ -48,8 +57,27 @@ class Auth:
         if request is None:
             return None
 
-        # Get the session name from the environment variable
-        session_name = os.getenv('SESSION_NAME', '_my_session_id')
+        # Return the cookie value with the key as the session name
+        return request.cookies.get(self.settings.session_name)
+
+    def current_user(self, request=None) -> TypeVar('User'):
+        """ Returns the User of the request, None without authentication """
+        return None
+
+    def check_login_rate(self, email: str, client_ip: str):
+        """ Raises RateLimitExceeded if the email or the client IP made too
+        many failed login attempts, before any password is hashed """
+        if self.rate_limiter is None:
+            return
+        limiter = self.rate_limiter
+        retry_after = max(limiter.retry_after("email:{}".format(email)),
+                          limiter.retry_after("ip:{}".format(client_ip)))
+        if retry_after > 0:
+            raise RateLimitExceeded(retry_after)
 
-        # Return the cookie value with the key as session_name
-        return request.cookies.get(session_name)
+    def record_failed_login(self, email: str, client_ip: str):
+        """ Counts a failed login attempt for the email and the client IP """
+        if self.rate_limiter is None:
+            return
+        self.rate_limiter.hit("email:{}".format(email))
+        self.rate_limiter.hit("ip:{}".format(client_ip))
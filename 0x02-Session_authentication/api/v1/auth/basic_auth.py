@@ -1,15 +1,86 @@
 #!/usr/bin/env python3
 """ Basic Authentication Module """
 
-import base64
+import binascii
+import re
+from flask import has_request_context, request
 from api.v1.auth.auth import Auth
 from models.user import User
-from typing import TypeVar
+from typing import Optional, Tuple, TypeVar
+
+
+BASIC_PREFIX = "Basic "
+# Longest accepted Authorization header, rejected before any decoding
+MAX_AUTHORIZATION_HEADER = 4096
+_BASE64_RE = re.compile(r'[A-Za-z0-9+/]*={0,2}')
+try:
+    # Python 3.11+: alphabet and padding are checked by the C decoder
+    binascii.a2b_base64("", strict_mode=True)
+    _STRICT_BASE64 = True
+except TypeError:
+    _STRICT_BASE64 = False
+
+# Reason codes of `BasicAuth.parse_basic_authorization_header`
+MISSING_HEADER = "missing_header"
+NOT_BASIC = "not_basic"
+TOO_LONG = "too_long"
+BAD_LENGTH = "bad_length"
+BAD_ALPHABET = "bad_alphabet"
+BAD_ENCODING = "bad_encoding"
+NO_SEPARATOR = "no_separator"
+
+
+def _decode_base64(value: str) -> Tuple[Optional[str], Optional[str]]:
+    """ Decodes a Base64 string to UTF-8 after checking its length and
+    alphabet, returns (decoded value, None) or (None, reason code) """
+    if len(value) % 4 != 0:
+        return None, BAD_LENGTH
+    if _STRICT_BASE64:
+        try:
+            decoded = binascii.a2b_base64(value, strict_mode=True)
+        except ValueError:
+            return None, BAD_ALPHABET
+    else:
+        if _BASE64_RE.fullmatch(value) is None:
+            return None, BAD_ALPHABET
+        decoded = binascii.a2b_base64(value)
+    try:
+        return decoded.decode('utf-8'), None
+    except UnicodeDecodeError:
+        return None, BAD_ENCODING
 
 
 class BasicAuth(Auth):
     """ BasicAuth class that inherits from Auth """
 
+    def parse_basic_authorization_header(
+            self, authorization_header: str
+    ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        Parses a Basic Authorization header in a single pass.
+
+        Args:
+            authorization_header (str): The Authorization header.
+
+        Returns:
+            tuple: (email, password, None) if valid, otherwise
+            (None, None, reason code).
+        """
+        if not isinstance(authorization_header, str):
+            return None, None, MISSING_HEADER
+        if len(authorization_header) > MAX_AUTHORIZATION_HEADER:
+            return None, None, TOO_LONG
+        if not authorization_header.startswith(BASIC_PREFIX):
+            return None, None, NOT_BASIC
+        decoded, reason = _decode_base64(
+            authorization_header[len(BASIC_PREFIX):])
+        if decoded is None:
+            return None, None, reason
+        email, separator, password = decoded.partition(':')
+        if not separator:
+            return None, None, NO_SEPARATOR
+        return email, password, None
+
     def extract_base64_authorization_header(
             self, authorization_header: str) -> str:
         """
@@ -25,9 +96,9 @@ class BasicAuth(Auth):
             return None
         if not isinstance(authorization_header, str):
             return None
-        if not authorization_header.startswith("Basic "):
+        if not authorization_header.startswith(BASIC_PREFIX):
             return None
-        return authorization_header[len("Basic "):]
+        return authorization_header[len(BASIC_PREFIX):]
 
     def decode_base64_authorization_header(
             self, base64_authorization_header: str) -> str:
@@ -44,11 +115,7 @@ class BasicAuth(Auth):
             return None
         if not isinstance(base64_authorization_header, str):
             return None
-        try:
-            decoded_bytes = base64.b64decode(base64_authorization_header)
-            return decoded_bytes.decode('utf-8')
-        except (base64.binascii.Error, UnicodeDecodeError):
-            return None
+        return _decode_base64(base64_authorization_header)[0]
 
     def extract_user_credentials(
             self, decoded_base64_authorization_header: str) -> (str, str):
@@ -83,22 +150,31 @@ class BasicAuth(Auth):
         Returns:
             User: The User instance if valid credentials are provided,
             otherwise None.
+
+        Raises:
+            RateLimitExceeded: If too many attempts failed for this email
+            or client IP.
         """
         if user_email is None or not isinstance(user_email, str):
             return None
         if user_pwd is None or not isinstance(user_pwd, str):
             return None
 
+        client_ip = request.remote_addr if has_request_context() else None
+        self.check_login_rate(user_email, client_ip)
+
         try:
             users = User.search({'email': user_email})
         except Exception:
             return None
 
         if not users or len(users) == 0:
+            self.record_failed_login(user_email, client_ip)
             return None
 
         user = users[0]
         if not user.is_valid_password(user_pwd):
+            self.record_failed_login(user_email, client_ip)
             return None
 
         return user
@@ -114,19 +190,9 @@ class BasicAuth(Auth):
             User: The User instance credentials are valid, otherwise None.
         """
         auth_header = self.authorization_header(request)
-        if auth_header is None:
-            return None
-
-        base64_header = self.extract_base64_authorization_header(auth_header)
-        if base64_header is None:
-            return None
-
-        decoded_header = self.decode_base64_authorization_header(base64_header)
-        if decoded_header is None:
-            return None
-
-        email, password = self.extract_user_credentials(decoded_header)
-        if email is None or password is None:
+        email, password, reason = \
+            self.parse_basic_authorization_header(auth_header)
+        if reason is not None:
             return None
 
         return self.user_object_from_credentials(email, password)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+""" Auth policies of the routes
+
+A view decorated with `auth_policy` carries the authentications it
+accepts, so `before_request` finds them with one lookup on the matched
+endpoint instead of matching the path against the excluded paths.
+"""
+from typing import Callable, Dict, FrozenSet, Optional, Sequence
+from flask import Flask
+from api.v1.auth.auth import Auth
+
+PUBLIC = "public"
+BASIC = "basic"
+SESSION = "session"
+POLICIES = (PUBLIC, BASIC, SESSION)
+
+
+def auth_policy(*policies: str) -> Callable:
+    """ Decorator attaching an auth policy to a view: PUBLIC, or the
+    authentications it accepts among BASIC and SESSION
+    """
+    if len(policies) == 0:
+        raise ValueError("auth_policy needs at least one policy")
+    for policy in policies:
+        if policy not in POLICIES:
+            raise ValueError("Auth policy must be one of {}".format(
+                ", ".join(POLICIES)))
+    if PUBLIC in policies and len(policies) > 1:
+        raise ValueError("A public route can't require an authentication")
+
+    def decorator(view: Callable) -> Callable:
+        view.auth_policy = frozenset(policies)
+        return view
+    return decorator
+
+
+def _excluded(rule: str, auth: Auth,
+              excluded_paths: Sequence[str]) -> Optional[bool]:
+    """ Whether every URL of a rule is excluded from authentication, None
+    when it depends on the values of its variables
+    """
+    if '<' not in rule:
+        return not auth.require_auth(rule, excluded_paths)
+    prefix = rule[:rule.index('<')]
+    for excluded_path in excluded_paths:
+        if excluded_path.endswith('*') and \
+                prefix.startswith(excluded_path[:-1]):
+            return True
+        if excluded_path.rstrip('*').startswith(prefix):
+            return None
+    return False
+
+
+def endpoint_policies(app: Flask, auth: Auth,
+                      excluded_paths: Sequence[str]
+                      ) -> Dict[str, FrozenSet[str]]:
+    """ Policy of each endpoint of `app` decorated with `auth_policy`
+
+    The excluded paths still apply: an endpoint whose URLs all match them
+    is PUBLIC. Endpoints missing from the result, undecorated or with
+    URLs only some of which match, are left to `Auth.require_auth`.
+    """
+    policies, undecided = {}, set()
+    for rule in app.url_map.iter_rules():
+        policy = getattr(app.view_functions.get(rule.endpoint),
+                         "auth_policy", None)
+        excluded = _excluded(rule.rule, auth, excluded_paths)
+        if policy is None or excluded is None:
+            undecided.add(rule.endpoint)
+            continue
+        if excluded:
+            policy = frozenset((PUBLIC,))
+        if policies.setdefault(rule.endpoint, policy) != policy:
+            # Rules of one endpoint with different policies
+            undecided.add(rule.endpoint)
+    for endpoint in undecided:
+        policies.pop(endpoint, None)
+    return policies
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Rate limiting module for the login paths
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+from werkzeug.exceptions import TooManyRequests
+
+
+class RateLimitExceeded(TooManyRequests):
+    """ 429 raised when a client made too many failed login attempts """
+
+    def __init__(self, retry_after: float):
+        """ Keep the delay, in seconds, before the client may retry """
+        super().__init__()
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+def _estimate(limit: int, window: int, now: float, start: int,
+              current: int, previous: int) -> float:
+    """
+    Sliding-window check from two fixed-window counters.
+
+    The number of hits in the last `window` seconds is approximated by
+    the current window's count plus the previous window's count weighted
+    by how much of it still overlaps the sliding window.
+
+    Returns:
+        float: 0 if a new hit is allowed, otherwise seconds to wait.
+    """
+    elapsed = now - start
+    if current >= limit:
+        # Wait for the next window, until `current` has decayed enough
+        return (window - elapsed) + window * (1 - limit / current)
+    if previous * (1 - elapsed / window) + current < limit:
+        return 0
+    return window * (1 - (limit - current) / previous) - elapsed
+
+
+def _roll(window: int, now: float, start: int, current: int,
+          previous: int) -> Tuple[int, int, int]:
+    """ Moves the counters to the window containing `now` """
+    now_start = int(now // window) * window
+    if now_start == start:
+        return start, current, previous
+    if now_start - start == window:
+        return now_start, 0, current
+    return now_start, 0, 0
+
+
+class MemoryRateLimiter:
+    """
+    In-process sliding-window limiter.
+
+    Each key costs three integers and at most `max_keys` keys are kept,
+    the least recently used ones being dropped first.
+    """
+
+    def __init__(self, limit: int, window: int, max_keys: int = 100000):
+        """
+        Args:
+            limit (int): hits allowed per window.
+            window (int): window length in seconds.
+            max_keys (int): maximum number of tracked keys.
+        """
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retry_after(self, key: str, now: float = None) -> float:
+        """ Returns 0 if `key` may try again, otherwise seconds to wait """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            counters = self._counters.get(key)
+            if counters is None:
+                return 0
+            return _estimate(self.limit, self.window, now,
+                             *_roll(self.window, now, *counters))
+
+    def hit(self, key: str, now: float = None):
+        """ Counts one attempt for `key` """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            start, current, previous = _roll(
+                self.window, now, *self._counters.pop(key, (0, 0, 0)))
+            self._counters[key] = (start, current + 1, previous)
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+
+
+class SQLiteRateLimiter:
+    """
+    Sliding-window limiter shared by every process of the host through a
+    SQLite file, with the same fixed memory per key as
+    `MemoryRateLimiter`. Rows of idle keys are purged as hits come in.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, limit: int, window: int, db_path: str):
+        """
+        Args:
+            limit (int): hits allowed per window.
+            window (int): window length in seconds.
+            db_path (str): path of the SQLite file.
+        """
+        self.limit = limit
+        self.window = window
+        self.db_path = db_path
+        self._local = threading.local()
+        self._hits = 0
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limit ("
+                         "key TEXT PRIMARY KEY, start INTEGER NOT NULL, "
+                         "current INTEGER NOT NULL, "
+                         "previous INTEGER NOT NULL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """ One connection per thread """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _counters(self, conn: sqlite3.Connection, key: str) -> tuple:
+        """ Stored counters of `key` """
+        row = conn.execute("SELECT start, current, previous FROM rate_limit "
+                           "WHERE key = ?", (key,)).fetchone()
+        return row if row is not None else (0, 0, 0)
+
+    def retry_after(self, key: str, now: float = None) -> float:
+        """ Returns 0 if `key` may try again, otherwise seconds to wait """
+        if now is None:
+            now = time.time()
+        counters = self._counters(self._connection(), key)
+        return _estimate(self.limit, self.window, now,
+                         *_roll(self.window, now, *counters))
+
+    def hit(self, key: str, now: float = None):
+        """ Counts one attempt for `key` """
+        if now is None:
+            now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            start, current, previous = _roll(self.window, now,
+                                             *self._counters(conn, key))
+            conn.execute("INSERT OR REPLACE INTO rate_limit "
+                         "(key, start, current, previous) "
+                         "VALUES (?, ?, ?, ?)",
+                         (key, start, current + 1, previous))
+            self._hits += 1
+            if self._hits % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limit WHERE start < ?",
+                             (now - 2 * self.window,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def build_rate_limiter(settings):
+    """ Creates the login rate limiter described by the settings, or None
+    when rate limiting is disabled """
+    if settings.login_rate_limit == 0:
+        return None
+    if settings.rate_limit_backend == "sqlite":
+        return SQLiteRateLimiter(settings.login_rate_limit,
+                                 settings.login_rate_window,
+                                 settings.rate_limit_db)
+    return MemoryRateLimiter(settings.login_rate_limit,
+                             settings.login_rate_window)
@@ -2,8 +2,11 @@
 """
 Session Authentication module
 """
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify
 from api.v1.auth.auth import Auth
+from api.v1.auth.policy import PUBLIC, auth_policy
+from api.v1.auth.session_token import SessionSigner
+from api.v1.settings import Settings
 import uuid
 from models.user import User
 
@@ -11,11 +14,22 @@ from models.user import User
 class SessionAuth(Auth):
     """
     Session authentication class that inherits from Auth.
+
+    With `SESSION_MODE=signed`, the session ID is a signed token carrying
+    the user ID, so no session data is kept on the server.
     """
 
     # Class attribute to store session data
     user_id_by_session_id = {}
 
+    def __init__(self, settings: Settings = None):
+        """ Initialize the session store according to the session mode """
+        super().__init__(settings)
+        self._signer = None
+        if self.settings.session_mode == "signed":
+            self._signer = SessionSigner(self.settings.session_secrets,
+                                         self.settings.session_duration)
+
     def create_session(self, user_id: str = None) -> str:
         """
         Creates a Session ID for a given user_id.
@@ -29,6 +43,12 @@ class SessionAuth(Auth):
         if user_id is None or not isinstance(user_id, str):
             return None
 
+        if self._signer is not None:
+            try:
+                return self._signer.sign(user_id)
+            except ValueError:
+                return None
+
         # Generate a unique session ID using uuid4
         session_id = str(uuid.uuid4())
 
@@ -50,6 +70,12 @@ class SessionAuth(Auth):
         if session_id is None or not isinstance(session_id, str):
             return None
 
+        if self._signer is not None:
+            session = self._signer.verify(session_id)
+            if session is None:
+                return None
+            return session[0]
+
         return self.user_id_by_session_id.get(session_id)
 
     def current_user(self, request=None):
@@ -84,6 +110,7 @@ session_auth_views = Blueprint(
 
 
 @session_auth_views.route('/auth_session/login', methods=['POST'])
+@auth_policy(PUBLIC)
 def login():
     """
     Handles user login and session creation.
@@ -100,22 +127,27 @@ def login():
     if not password:
         return jsonify({"error": "password missing"}), 400
 
+    from api.v1.app import auth
+    # Reject throttled clients before hashing the password
+    auth.check_login_rate(email, request.remote_addr)
+
     user = User.search({"email": email})
     if not user:
+        auth.record_failed_login(email, request.remote_addr)
         return jsonify({"error": "no user found for this email"}), 404
 
     user = user[0]  # Assuming search returns a list
     if not user.is_valid_password(password):
+        auth.record_failed_login(email, request.remote_addr)
         return jsonify({"error": "wrong password"}), 401
 
     # Create a session ID
-    from api.v1.app import auth
     session_id = auth.create_session(user.id)
     if session_id is None:
         return jsonify({"error": "session creation failed"}), 500
 
     # Set the session ID cookie
-    response = jsonify(user.to_json())
-    response.set_cookie(current_app.config['SESSION_NAME'], session_id)
+    response = jsonify(user.to_json(raw_datetimes=True))
+    response.set_cookie(auth.settings.session_name, session_id)
 
     return response
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Signed session token module
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import time
+from typing import Dict, Sequence, Tuple
+
+# Lifetime of a token in seconds, one day
+DEFAULT_DURATION = 24 * 60 * 60
+
+
+def _b64encode(data: bytes) -> str:
+    """ URL-safe Base64 without padding """
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    """ Reverse of `_b64encode` """
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def key_id(key: str) -> str:
+    """ Short identifier of a signing key, stored in each token """
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]
+
+
+class SessionSigner:
+    """
+    Issues and verifies HMAC-SHA256 signed session tokens.
+
+    A token is `<payload>.<signature>`, both URL-safe Base64, where the
+    payload is `<key id>|<user id>|<issued at>|<expires at>`. The first key
+    signs new tokens; every key verifies, which allows key rotation: put
+    the new key first and drop the old one once its tokens have expired.
+
+    Tokens can't be revoked one by one, so every token expires.
+    """
+
+    def __init__(self, keys: Sequence[str], duration: int = DEFAULT_DURATION):
+        """
+        Args:
+            keys (Sequence[str]): secret keys, the first one signs.
+            duration (int): lifetime of a token in seconds.
+        """
+        if not keys:
+            raise ValueError("At least one signing key is required")
+        if not isinstance(duration, int) or duration <= 0:
+            raise ValueError("Token duration must be a positive integer")
+        self._keys: Dict[str, bytes] = {}
+        for key in keys:
+            self._keys[key_id(key)] = key.encode('utf-8')
+        self._signing_kid = key_id(keys[0])
+        self.duration = duration
+
+    def _signature(self, key: bytes, payload: bytes) -> bytes:
+        """ HMAC-SHA256 of the payload """
+        return hmac.new(key, payload, hashlib.sha256).digest()
+
+    def sign(self, user_id: str, now: int = None) -> str:
+        """
+        Creates a signed token for a user ID.
+
+        Args:
+            user_id (str): The user ID.
+            now (int): Issue time (epoch seconds), defaults to now.
+
+        Returns:
+            str: The token.
+
+        Raises:
+            ValueError: If the user ID contains the payload separator.
+        """
+        if '|' in user_id:
+            raise ValueError("User ID can't contain '|'")
+        issued_at = int(time.time()) if now is None else now
+        expires_at = issued_at + self.duration
+        payload = "{}|{}|{}|{}".format(self._signing_kid, user_id,
+                                       issued_at, expires_at).encode('utf-8')
+        signature = self._signature(self._keys[self._signing_kid], payload)
+        return "{}.{}".format(_b64encode(payload), _b64encode(signature))
+
+    def verify(self, token: str, now: int = None) -> Tuple[str, int, int]:
+        """
+        Verifies a token.
+
+        Args:
+            token (str): The token.
+            now (int): Current time (epoch seconds), defaults to now.
+
+        Returns:
+            tuple: (user_id, issued_at, expires_at) if the token is valid
+            and not expired, otherwise None.
+        """
+        if not isinstance(token, str) or token.count('.') != 1:
+            return None
+        b64_payload, b64_signature = token.split('.')
+        try:
+            payload = _b64decode(b64_payload)
+            signature = _b64decode(b64_signature)
+            kid, user_id, issued_at, expires_at = \
+                payload.decode('utf-8').split('|')
+            issued_at, expires_at = int(issued_at), int(expires_at)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+
+        key = self._keys.get(kid)
+        if key is None:
+            return None
+        if not hmac.compare_digest(self._signature(key, payload), signature):
+            return None
+
+        if now is None:
+            now = int(time.time())
+        # Tokens without expiry, issued before it was required, included
+        if now >= expires_at:
+            return None
+        return user_id, issued_at, expires_at
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+""" Compression of the API responses
+
+Negotiates gzip, deflate and, when the brotli package is installed, br
+from the Accept-Encoding header of the request. Responses smaller than a
+threshold are sent as is, and streamed responses are compressed chunk by
+chunk as they are sent.
+"""
+import zlib
+from typing import Callable, Iterable, Iterator
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first when the client accepts several with the same quality
+ENCODINGS = ("br", "gzip", "deflate") if brotli is not None \
+    else ("gzip", "deflate")
+
+
+def compression_level(level: int) -> Callable:
+    """ Decorator setting the compression level of a view, 0 disabling
+    compression for it
+    """
+    def decorator(view: Callable) -> Callable:
+        view.compression_level = level
+        return view
+    return decorator
+
+
+class _Compressor():
+    """ Incremental compressor of one response
+    """
+
+    def __init__(self, encoding: str, level: int):
+        """ Start a gzip, deflate or br stream
+        """
+        if encoding == "br":
+            # Brotli qualities go from 0 to 11
+            self._brotli = brotli.Compressor(quality=min(11, level + 2))
+        else:
+            self._brotli = None
+            wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" \
+                else zlib.MAX_WBITS
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data: bytes) -> bytes:
+        """ Compress a chunk, possibly buffering it
+        """
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        """ Output the buffered data, so the client can read the chunk
+        """
+        if self._brotli is not None:
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """ End the stream
+        """
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def _compress_stream(first: Iterable[bytes], rest: Iterator[bytes],
+                     compressor: _Compressor) -> Iterator[bytes]:
+    """ Compress the chunks of a streamed response, flushing each one
+    """
+    for chunks in (first, rest):
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+    yield compressor.finish()
+
+
+def _peek(chunks: Iterator[bytes], min_size: int) -> list:
+    """ Read chunks until they reach `min_size` bytes or the end
+    """
+    first, size = [], 0
+    for chunk in chunks:
+        first.append(chunk)
+        size += len(chunk)
+        if size >= min_size:
+            break
+    return first
+
+
+def init_app(app: Flask, level: int = 6, min_size: int = 1024):
+    """ Compress the responses of `app` of at least `min_size` bytes
+    """
+
+    @app.after_request
+    def compress(response: Response) -> Response:
+        """ Compress the response with the encoding the client prefers
+        """
+        if response.status_code < 200 or response.status_code in (204, 304) \
+                or response.direct_passthrough \
+                or "Content-Encoding" in response.headers:
+            return response
+        view = current_app.view_functions.get(request.endpoint)
+        route_level = getattr(view, "compression_level", level)
+        if route_level == 0:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            chunks = response.iter_encoded()
+            first = _peek(chunks, min_size)
+            if sum(len(chunk) for chunk in first) < min_size:
+                response.response = first
+                return response
+            response.response = _compress_stream(
+                first, chunks, _Compressor(encoding, route_level))
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            compressor = _Compressor(encoding, route_level)
+            response.set_data(compressor.compress(data) +
+                              compressor.finish())
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            # The compressed body isn't byte-for-byte the same resource
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+""" JSON encoding of the API responses
+
+Uses orjson when it is installed and the stdlib `json` module otherwise.
+Both encode `datetime` values natively, in the TIMESTAMP_FORMAT of
+models.base, and always write compact output, even in debug mode.
+"""
+import json
+from datetime import datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Flask >= 2.2
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    DefaultJSONProvider = None
+
+COMPACT_SEPARATORS = (",", ":")
+
+if orjson is not None:
+    # Naive datetimes are written as TIMESTAMP_FORMAT, without microseconds
+    ORJSON_OPTIONS = orjson.OPT_OMIT_MICROSECONDS | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """ Encode the values the stdlib encoder doesn't know
+    """
+    if isinstance(value, datetime):
+        # Same as strftime(TIMESTAMP_FORMAT) for naive datetimes, faster
+        return value.isoformat(timespec="seconds")
+    raise TypeError("Object of type {} is not JSON serializable".format(
+        type(value).__name__))
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = True) -> bytes:
+    """ Encode `obj` as compact JSON, in UTF-8
+    """
+    if orjson is not None:
+        options = ORJSON_OPTIONS
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=_default, option=options)
+        except orjson.JSONEncodeError:
+            # Integers over 64 bits, mixed key types when sorting...
+            pass
+    return json.dumps(obj, default=_default, sort_keys=sort_keys,
+                      ensure_ascii=False,
+                      separators=COMPACT_SEPARATORS).encode("utf-8")
+
+
+def dumps(obj: Any, sort_keys: bool = True) -> str:
+    """ Encode `obj` as compact JSON
+    """
+    return dumps_bytes(obj, sort_keys).decode("utf-8")
+
+
+class APIJSONEncoder(json.JSONEncoder):
+    """ JSON encoder of Flask < 2.2, set as `app.json_encoder`
+
+    `indent` and `separators` are ignored, so `jsonify` stays compact
+    in debug mode.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """ Initialize a compact encoder
+        """
+        kwargs["indent"] = None
+        kwargs["separators"] = COMPACT_SEPARATORS
+        super().__init__(*args, **kwargs)
+
+    def default(self, o: Any) -> Any:
+        """ Encode datetimes
+        """
+        return _default(o)
+
+    def encode(self, o: Any) -> str:
+        """ Encode `o` with the fastest encoder available
+        """
+        return dumps(o, self.sort_keys)
+
+
+if DefaultJSONProvider is not None:
+    class APIJSONProvider(DefaultJSONProvider):
+        """ JSON provider of Flask >= 2.2, set as `app.json`
+        """
+        compact = True
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            """ Encode `obj`, ignoring `indent` and `separators`
+            """
+            return dumps(obj, kwargs.get("sort_keys", self.sort_keys))
+
+        def response(self, *args: Any, **kwargs: Any):
+            """ JSON response of the arguments, encoded without going
+            through a str
+            """
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(
+                dumps_bytes(obj, self.sort_keys) + b"\n",
+                mimetype=self.mimetype)
+else:
+    APIJSONProvider = None
+
+
+def init_app(app):
+    """ Use the encoders of this module for the JSON responses of `app`
+    """
+    if APIJSONProvider is not None:
+        app.json = APIJSONProvider(app)
+    else:
+        app.json_encoder = APIJSONEncoder
+        app.config["JSONIFY_PRETTYPRINT_REGULAR"] = False
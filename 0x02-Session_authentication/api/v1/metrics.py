@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+""" Metrics module of the API: latency histograms of the auth pipeline
+"""
+from bisect import bisect_left
+from functools import wraps
+from random import random
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float("inf"))
+
+
+class Histogram():
+    """ Fixed-bucket latency histogram
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        """ Initialize empty buckets
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = Lock()
+
+    def observe(self, value: float):
+        """ Record one duration, in seconds
+        """
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Registry():
+    """ Histograms of the auth pipeline, one per stage
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        """ Initialize an empty registry
+        """
+        self.sample_rate = sample_rate
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        """ Return the histogram of a stage, created on first use
+        """
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def timed(self, stage: str) -> Callable:
+        """ Decorator recording the duration of a sample of the calls
+        """
+        histogram = self.histogram(stage)
+
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if self.sample_rate < 1.0 and random() >= self.sample_rate:
+                    return func(*args, **kwargs)
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    histogram.observe(perf_counter() - start)
+            wrapper.timed_stage = stage
+            return wrapper
+        return decorator
+
+    def instrument(self, cls: type, name: str, stage: str):
+        """ Replace the method `name` of `cls` by a timed one
+        """
+        method = cls.__dict__[name]
+        if hasattr(getattr(method, "__func__", method), "timed_stage"):
+            return
+        if isinstance(method, classmethod):
+            setattr(cls, name, classmethod(self.timed(stage)(
+                method.__func__)))
+        else:
+            setattr(cls, name, self.timed(stage)(method))
+
+    def to_prometheus(self) -> str:
+        """ Render the histograms in the Prometheus text format
+        """
+        name = "auth_stage_duration_seconds"
+        lines: List[str] = [
+            "# HELP {} Latency of the auth pipeline stages".format(name),
+            "# TYPE {} histogram".format(name),
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, count = histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(
+                    name, stage, le, cumulative))
+            lines.append('{}_sum{{stage="{}"}} {!r}'.format(
+                name, stage, total))
+            lines.append('{}_count{{stage="{}"}} {}'.format(
+                name, stage, count))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
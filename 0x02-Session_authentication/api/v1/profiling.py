@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+""" Profiling middleware of the API, off unless PROFILE_DIR is set
+
+A request is profiled when it carries the `X-Profile-Token` header with
+the PROFILE_TOKEN value, or when it is drawn at PROFILE_SAMPLE_RATE. The
+overhead of a worker is bounded: it profiles one request at a time, and
+at most one sampled request every PROFILE_INTERVAL seconds. The body of
+a profiled response is buffered, so streamed responses are profiled to
+their end.
+"""
+import cProfile
+import os
+import re
+import sys
+import time
+from collections import Counter
+from itertools import count
+from hmac import compare_digest
+from random import random
+from threading import Event, Lock, Thread, get_ident
+from typing import Callable, Iterable
+from api.v1.settings import Settings
+
+PROFILE_HEADER = "HTTP_X_PROFILE_TOKEN"
+# Period of the stack sampler of the collapsed format, in seconds
+SAMPLE_PERIOD = 0.001
+
+
+def _frame_name(frame) -> str:
+    """ Name of a frame in a collapsed stack
+    """
+    code = frame.f_code
+    return "{} ({}:{})".format(code.co_name,
+                               os.path.basename(code.co_filename),
+                               code.co_firstlineno)
+
+
+class _StackSampler():
+    """ Count the stacks of a thread, sampled from another thread
+    """
+
+    def __init__(self, thread_id: int, root: Callable):
+        """ Start sampling the thread `thread_id`, keeping the frames from
+        the call of `root`
+        """
+        self.thread_id = thread_id
+        self.root = root.__code__
+        self.stacks = Counter()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """ Record one stack every SAMPLE_PERIOD until stopped
+        """
+        while not self._stop.wait(SAMPLE_PERIOD):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                if frame.f_code is self.root:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    break
+                frame = frame.f_back
+
+    def stop(self):
+        """ Stop sampling
+        """
+        self._stop.set()
+        self._thread.join()
+
+
+class ProfilerMiddleware():
+    """ WSGI middleware profiling a bounded share of the requests
+    """
+
+    def __init__(self, wsgi_app: Callable, settings: Settings):
+        """ Wrap `wsgi_app`, writing the profiles to settings.profile_dir
+        """
+        self.wsgi_app = wsgi_app
+        self.settings = settings
+        self._lock = Lock()
+        self._last_sample = float("-inf")
+        # Keeps apart the profiles of one worker in the same second
+        self._sequence = count(1)
+        os.makedirs(settings.profile_dir, exist_ok=True)
+
+    def _requested(self, environ: dict) -> bool:
+        """ Whether the request asks to be profiled, or is sampled
+        """
+        token = environ.get(PROFILE_HEADER)
+        if token is not None and self.settings.profile_token is not None:
+            return compare_digest(token.encode(),
+                                  self.settings.profile_token.encode())
+        if self.settings.profile_sample_rate == 0 or \
+                random() >= self.settings.profile_sample_rate:
+            return False
+        now = time.monotonic()
+        if now - self._last_sample < self.settings.profile_interval:
+            return False
+        self._last_sample = now
+        return True
+
+    def _file_path(self, environ: dict, extension: str) -> str:
+        """ Path of the profile of a request
+        """
+        path = re.sub(r"[^A-Za-z0-9]+", "_",
+                      environ.get("PATH_INFO", "")).strip("_") or "root"
+        name = "{}.{}.{}.{}.{}.{}".format(
+            time.strftime("%Y%m%dT%H%M%S"), os.getpid(), next(self._sequence),
+            environ.get("REQUEST_METHOD", "GET"), path[:100], extension)
+        return os.path.join(self.settings.profile_dir, name)
+
+    def _run(self, environ: dict, start_response: Callable) -> list:
+        """ Run the request to the end, streamed bodies included
+        """
+        body = self.wsgi_app(environ, start_response)
+        try:
+            return list(body)
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable:
+        """ Run the request, under a profiler if it is chosen
+        """
+        if not self._requested(environ):
+            return self.wsgi_app(environ, start_response)
+        if not self._lock.acquire(blocking=False):
+            # Already profiling a request in this worker
+            return self.wsgi_app(environ, start_response)
+        try:
+            if self.settings.profile_format == "collapsed":
+                return self._sample(environ, start_response)
+            return self._profile(environ, start_response)
+        finally:
+            self._lock.release()
+
+    def _profile(self, environ: dict, start_response: Callable) -> Iterable:
+        """ Run the request under cProfile, and dump the pstats file
+        """
+        profile = cProfile.Profile()
+        body = profile.runcall(self._run, environ, start_response)
+        profile.dump_stats(self._file_path(environ, "prof"))
+        return body
+
+    def _sample(self, environ: dict, start_response: Callable) -> Iterable:
+        """ Sample the stacks of the request, and write them collapsed,
+        the input format of flamegraph.pl and speedscope
+        """
+        sampler = _StackSampler(get_ident(), ProfilerMiddleware._run)
+        try:
+            body = self._run(environ, start_response)
+        finally:
+            sampler.stop()
+        with open(self._file_path(environ, "collapsed"), 'w') as f:
+            for stack, count in sampler.stacks.items():
+                f.write("{} {}\n".format(stack, count))
+        return body
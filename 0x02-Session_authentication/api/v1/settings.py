@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+""" Settings module for the API
+"""
+from dataclasses import dataclass
+from os import getenv
+from typing import Mapping, Optional, Tuple
+
+
+AUTH_TYPES = (None, "basic_auth", "session_auth")
+SESSION_MODES = ("memory", "signed")
+RATE_LIMIT_BACKENDS = ("memory", "sqlite")
+PROFILE_FORMATS = ("cprofile", "collapsed")
+DEFAULT_EXCLUDED_PATHS = (
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+    '/api/v1/auth_session/login/',
+    '/api/v1/healthz/',
+    '/api/v1/readyz/',
+)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """ Immutable configuration of the API
+
+    Built once at startup (see `Settings.from_env`) and injected into the
+    `Auth` classes, so request handling never reads the environment.
+    """
+    auth_type: Optional[str] = None
+    session_name: str = "_my_session_id"
+    excluded_paths: Tuple[str, ...] = DEFAULT_EXCLUDED_PATHS
+    host: str = "0.0.0.0"
+    port: int = 5000
+    store_dir: str = "."
+    session_mode: str = "memory"
+    session_secrets: Tuple[str, ...] = ()
+    session_duration: int = 86400
+    login_rate_limit: int = 0
+    login_rate_window: int = 60
+    trusted_proxies: int = 0
+    rate_limit_backend: str = "memory"
+    rate_limit_db: str = ".rate_limit.db"
+    metrics_sample_rate: float = 1.0
+    compression: bool = False
+    compression_level: int = 6
+    compression_min_size: int = 1024
+    workers: int = 0
+    threads: int = 1
+    profile_dir: Optional[str] = None
+    profile_token: Optional[str] = None
+    profile_sample_rate: float = 0.0
+    profile_interval: int = 10
+    profile_format: str = "cprofile"
+
+    def __post_init__(self):
+        """ Validate the settings
+        """
+        if self.auth_type not in AUTH_TYPES:
+            raise ValueError("AUTH_TYPE must be one of {}".format(
+                ", ".join(str(t) for t in AUTH_TYPES)))
+        if not isinstance(self.session_name, str) or \
+                len(self.session_name) == 0:
+            raise ValueError("SESSION_NAME can't be empty")
+        if not isinstance(self.port, int) or not 0 < self.port < 65536:
+            raise ValueError("API_PORT must be between 1 and 65535")
+        if self.session_mode not in SESSION_MODES:
+            raise ValueError("SESSION_MODE must be one of {}".format(
+                ", ".join(SESSION_MODES)))
+        if self.session_mode == "signed" and len(self.session_secrets) == 0:
+            raise ValueError("SESSION_SECRET is required for signed sessions")
+        if not isinstance(self.session_duration, int) or \
+                self.session_duration < 0:
+            raise ValueError("SESSION_DURATION must be a positive integer")
+        if self.session_mode == "signed" and self.session_duration == 0:
+            raise ValueError("Signed sessions need a SESSION_DURATION")
+        if not isinstance(self.login_rate_limit, int) or \
+                self.login_rate_limit < 0:
+            raise ValueError("LOGIN_RATE_LIMIT must be a positive integer")
+        if not isinstance(self.login_rate_window, int) or \
+                self.login_rate_window <= 0:
+            raise ValueError("LOGIN_RATE_WINDOW must be a positive integer")
+        if not isinstance(self.trusted_proxies, int) or \
+                self.trusted_proxies < 0:
+            raise ValueError("TRUSTED_PROXIES must be a positive integer")
+        if self.rate_limit_backend not in RATE_LIMIT_BACKENDS:
+            raise ValueError("RATE_LIMIT_BACKEND must be one of {}".format(
+                ", ".join(RATE_LIMIT_BACKENDS)))
+        if not isinstance(self.metrics_sample_rate, (int, float)) or \
+                not 0 <= self.metrics_sample_rate <= 1:
+            raise ValueError("METRICS_SAMPLE_RATE must be between 0 and 1")
+        if not isinstance(self.compression_level, int) or \
+                not 1 <= self.compression_level <= 9:
+            raise ValueError("COMPRESSION_LEVEL must be between 1 and 9")
+        if not isinstance(self.compression_min_size, int) or \
+                self.compression_min_size < 0:
+            raise ValueError("COMPRESSION_MIN_SIZE must be a positive integer")
+        if not isinstance(self.workers, int) or self.workers < 0:
+            raise ValueError("WORKERS must be a positive integer")
+        if not isinstance(self.threads, int) or self.threads < 1:
+            raise ValueError("THREADS must be at least 1")
+        if not isinstance(self.profile_sample_rate, (int, float)) or \
+                not 0 <= self.profile_sample_rate <= 1:
+            raise ValueError("PROFILE_SAMPLE_RATE must be between 0 and 1")
+        if not isinstance(self.profile_interval, int) or \
+                self.profile_interval < 0:
+            raise ValueError("PROFILE_INTERVAL must be a positive integer")
+        if self.profile_format not in PROFILE_FORMATS:
+            raise ValueError("PROFILE_FORMAT must be one of {}".format(
+                ", ".join(PROFILE_FORMATS)))
+        for excluded_path in self.excluded_paths:
+            if not excluded_path.startswith('/'):
+                raise ValueError("Excluded path {} must start with '/'"
+                                 .format(excluded_path))
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] = None) -> 'Settings':
+        """ Build the settings from environment variables
+        """
+        if env is None:
+            env = {}
+            for key in ("AUTH_TYPE", "SESSION_NAME", "EXCLUDED_PATHS",
+                        "API_HOST", "API_PORT", "STORE_DIR", "SESSION_MODE",
+                        "SESSION_SECRET", "SESSION_DURATION",
+                        "LOGIN_RATE_LIMIT", "LOGIN_RATE_WINDOW",
+                        "TRUSTED_PROXIES", "RATE_LIMIT_BACKEND",
+                        "RATE_LIMIT_DB",
+                        "METRICS_SAMPLE_RATE", "COMPRESSION",
+                        "COMPRESSION_LEVEL", "COMPRESSION_MIN_SIZE",
+                        "WORKERS", "THREADS", "PROFILE_DIR",
+                        "PROFILE_TOKEN", "PROFILE_SAMPLE_RATE",
+                        "PROFILE_INTERVAL", "PROFILE_FORMAT"):
+                value = getenv(key)
+                if value is not None:
+                    env[key] = value
+
+        excluded_paths = DEFAULT_EXCLUDED_PATHS
+        if env.get("EXCLUDED_PATHS"):
+            excluded_paths = tuple(p.strip()
+                                   for p in env["EXCLUDED_PATHS"].split(',')
+                                   if p.strip())
+        integers = {}
+        for key, default in (("API_PORT", "5000"),
+                             ("SESSION_DURATION", "86400"),
+                             ("LOGIN_RATE_LIMIT", "0"),
+                             ("LOGIN_RATE_WINDOW", "60"),
+                             ("TRUSTED_PROXIES", "0"),
+                             ("COMPRESSION_LEVEL", "6"),
+                             ("COMPRESSION_MIN_SIZE", "1024"),
+                             ("WORKERS", "0"), ("THREADS", "1"),
+                             ("PROFILE_INTERVAL", "10")):
+            try:
+                integers[key] = int(env.get(key, default))
+            except ValueError:
+                raise ValueError("{} must be an integer".format(key))
+        floats = {}
+        for key, default in (("METRICS_SAMPLE_RATE", "1.0"),
+                             ("PROFILE_SAMPLE_RATE", "0.0")):
+            try:
+                floats[key] = float(env.get(key, default))
+            except ValueError:
+                raise ValueError("{} must be a number".format(key))
+        # Comma-separated, the first secret signs and all of them verify
+        session_secrets = tuple(k.strip()
+                                for k in env.get("SESSION_SECRET", "")
+                                .split(',') if k.strip())
+
+        return cls(
+            auth_type=env.get("AUTH_TYPE") or None,
+            session_name=env.get("SESSION_NAME", "_my_session_id"),
+            excluded_paths=excluded_paths,
+            host=env.get("API_HOST", "0.0.0.0"),
+            port=integers["API_PORT"],
+            store_dir=env.get("STORE_DIR", "."),
+            session_mode=env.get("SESSION_MODE", "memory"),
+            session_secrets=session_secrets,
+            session_duration=integers["SESSION_DURATION"],
+            login_rate_limit=integers["LOGIN_RATE_LIMIT"],
+            login_rate_window=integers["LOGIN_RATE_WINDOW"],
+            trusted_proxies=integers["TRUSTED_PROXIES"],
+            rate_limit_backend=env.get("RATE_LIMIT_BACKEND", "memory"),
+            rate_limit_db=env.get("RATE_LIMIT_DB", ".rate_limit.db"),
+            metrics_sample_rate=floats["METRICS_SAMPLE_RATE"],
+            compression=env.get("COMPRESSION", "").lower() in (
+                "1", "true", "yes"),
+            compression_level=integers["COMPRESSION_LEVEL"],
+            compression_min_size=integers["COMPRESSION_MIN_SIZE"],
+            workers=integers["WORKERS"],
+            threads=integers["THREADS"],
+            profile_dir=env.get("PROFILE_DIR") or None,
+            profile_token=env.get("PROFILE_TOKEN") or None,
+            profile_sample_rate=floats["PROFILE_SAMPLE_RATE"],
+            profile_interval=integers["PROFILE_INTERVAL"],
+            profile_format=env.get("PROFILE_FORMAT", "cprofile"),
+        )
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 """ Module of Index views
 """
+import os
 from flask import jsonify, abort
+from api.v1.auth.policy import BASIC, PUBLIC, SESSION, auth_policy
 from api.v1.views import app_views
 
 
 @app_views.route('/status', methods=['GET'], strict_slashes=False)
+@auth_policy(PUBLIC)
 def status() -> str:
     """ GET /api/v1/status
     Return:
@@ -14,13 +17,53 @@ def status() -> str:
     return jsonify({"status": "OK"})
 
 
+@app_views.route('/healthz', methods=['GET'], strict_slashes=False)
+@auth_policy(PUBLIC)
+def healthz() -> str:
+    """ GET /api/v1/healthz
+    Return:
+      - 200 while the process answers, for liveness probes
+    """
+    return jsonify({"status": "alive"})
+
+
+@app_views.route('/readyz', methods=['GET'], strict_slashes=False)
+@auth_policy(PUBLIC)
+def readyz() -> str:
+    """ GET /api/v1/readyz
+    Return:
+      - 200 once the users are loaded and the store is writable
+      - 503 otherwise, for readiness probes
+    """
+    from models import base
+    if "User" not in base.DATA or not os.access(base.STORE_DIR, os.W_OK):
+        return jsonify({"status": "not ready"}), 503
+    return jsonify({"status": "ready"})
+
+
 @app_views.route('/stats/', strict_slashes=False)
+@auth_policy(BASIC, SESSION)
 def stats() -> str:
     """ GET /api/v1/stats
     Return:
-      - the number of each objects
+      - the number of each objects, and aggregates of the users kept up
+        to date by the model layer
     """
     from models.user import User
     stats = {}
     stats['users'] = User.count()
+    stats['users_created_per_day'] = User.aggregate("created_per_day")
+    stats['users_with_names'] = User.aggregate("with_names")
     return jsonify(stats)
+
+
+@app_views.route('/metrics', methods=['GET'], strict_slashes=False)
+@auth_policy(BASIC, SESSION)
+def metrics() -> str:
+    """ GET /api/v1/metrics
+    Return:
+      - latency histograms of the auth pipeline, in Prometheus text format
+    """
+    from api.v1.metrics import REGISTRY
+    return REGISTRY.to_prometheus(), 200, {
+        "Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
@@ -1,28 +1,185 @@
 #!/usr/bin/env python3
 """ Module of Users views
 """
+import codecs
+import json
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import IO, Iterator
+from api.v1.auth.policy import BASIC, SESSION, auth_policy
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request
+from api.v1.json_provider import dumps_bytes
 from models.user import User
 
+# Largest number of users accepted by POST /api/v1/users/batch
+MAX_BATCH_SIZE = 100000
+STREAM_CHUNK_SIZE = 64 * 1024
+# Largest item of a batch body: bytes of a NDJSON line, characters of an
+# array item. Bounds the memory and the parsing work of one request.
+MAX_ITEM_SIZE = 64 * 1024
+# Whitespace allowed between JSON tokens
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Store versions restart at 0 in every process, the token keeps the
+# collection ETags of two processes apart. Forked workers of a preloaded
+# app must call new_store_token, or they share the token of the master.
+STORE_TOKEN = uuid.uuid4().hex[:8]
+# Per class: (store version, serialized collection)
+_PAYLOADS = {}
+
+
+def new_store_token() -> str:
+    """ Give the collection ETags of this process a new token
+    """
+    global STORE_TOKEN
+    STORE_TOKEN = uuid.uuid4().hex[:8]
+    return STORE_TOKEN
+
+
+def _iter_ndjson(stream: IO[bytes]) -> Iterator:
+    """ Yield each line of a NDJSON stream, decoded, or the ValueError
+    raised when decoding it
+
+    Raises:
+        ValueError: if a line is longer than MAX_ITEM_SIZE
+    """
+    while True:
+        line = stream.readline(MAX_ITEM_SIZE + 1)
+        if not line:
+            return
+        if len(line) > MAX_ITEM_SIZE and not line.endswith(b"\n"):
+            raise ValueError("Line longer than {} bytes".format(
+                MAX_ITEM_SIZE))
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+
+def _iter_json_array(stream: IO[bytes]) -> Iterator:
+    """ Yield each item of a JSON array read from a stream, keeping at most
+    one item and one chunk in memory
+
+    Raises:
+        ValueError: if the body is not a JSON array, or an item is longer
+        than MAX_ITEM_SIZE
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    # Parsing moves `pos` forward, the buffer is only cut on a new chunk
+    buffer, pos, eof, state, need_more = "", 0, False, "start", True
+    while True:
+        if need_more:
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            if len(buffer) - pos > MAX_ITEM_SIZE:
+                # Stop before buffering a huge or unterminated item
+                raise ValueError("Item longer than {} characters".format(
+                    MAX_ITEM_SIZE))
+            chunk = stream.read(STREAM_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+            pos, need_more = 0, False
+        pos = _JSON_WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            need_more = True
+        elif state == "start":
+            if buffer[pos] != '[':
+                raise ValueError("Expected a JSON array")
+            pos, state = pos + 1, "first"
+        elif state == "after":
+            if buffer[pos] == ']':
+                return
+            if buffer[pos] != ',':
+                raise ValueError("Expected ',' or ']'")
+            pos, state = pos + 1, "item"
+        elif state == "first" and buffer[pos] == ']':
+            return
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+                need_more = True
+                continue
+            if end == len(buffer) and not eof:
+                # A value touching the end of the buffer may be truncated
+                need_more = True
+                continue
+            yield item
+            pos, state = end, "after"
+
+
+def _not_modified(etag: str, last_modified: datetime) -> Response:
+    """ 304 response if the client copy is still valid, None otherwise
+
+    If-None-Match wins over If-Modified-Since, as in RFC 7232.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since is not None and last_modified is not None:
+        since = request.if_modified_since
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        # HTTP dates have a precision of one second
+        fresh = last_modified.replace(microsecond=0) <= since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return _with_validators(Response(status=304), etag, last_modified)
+
+
+def _with_validators(response: Response, etag: str,
+                     last_modified: datetime) -> Response:
+    """ Set the ETag and Last-Modified headers of a response
+    """
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return response
+
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
+@auth_policy(BASIC, SESSION)
 def view_all_users() -> str:
     """ GET /api/v1/users
     Return:
       - list of all User objects JSON represented
+      - 304 if the list didn't change since the client copy
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    version = User.version()
+    etag = "users-{}-{}".format(STORE_TOKEN, version)
+    last_modified = User.last_modified()
+    response = _not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    cached = _PAYLOADS.get(User.__name__)
+    if cached is None or cached[0] != version:
+        # Any save or remove bumps the version, invalidating the payload
+        all_users = [user.to_json(raw_datetimes=True)
+                     for user in User.all()]
+        cached = (version, dumps_bytes(all_users) + b"\n")
+        _PAYLOADS[User.__name__] = cached
+    response = Response(cached[1], mimetype="application/json")
+    return _with_validators(response, etag, last_modified)
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
+@auth_policy(BASIC, SESSION)
 def view_one_user(user_id: str = None) -> str:
     """ GET /api/v1/users/:id
     Path parameter:
       - User ID
     Return:
       - User object JSON represented
+      - 304 if the User didn't change since the client copy
       - 404 if the User ID doesn't exist
     """
     if user_id is None:
@@ -30,10 +187,16 @@ def view_one_user(user_id: str = None) -> str:
     user = User.get(user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_json())
+    etag = "{}-{}".format(user.id, int(user.updated_at.timestamp() * 1e6))
+    response = _not_modified(etag, user.updated_at)
+    if response is not None:
+        return response
+    response = jsonify(user.to_json(raw_datetimes=True))
+    return _with_validators(response, etag, user.updated_at)
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
+@auth_policy(BASIC, SESSION)
 def delete_user(user_id: str = None) -> str:
     """ DELETE /api/v1/users/:id
     Path parameter:
@@ -51,7 +214,31 @@ def delete_user(user_id: str = None) -> str:
     return jsonify({}), 200
 
 
+def _user_json_error(rj) -> str:
+    """ Error message of an invalid User JSON body, None if valid
+    """
+    if rj is None or not isinstance(rj, dict):
+        return "Wrong format"
+    if rj.get("email", "") == "":
+        return "email missing"
+    if rj.get("password", "") == "":
+        return "password missing"
+    return None
+
+
+def _user_from_json(rj: dict) -> User:
+    """ New User built from a valid JSON body, not saved yet
+    """
+    user = User()
+    user.email = rj.get("email")
+    user.password = rj.get("password")
+    user.first_name = rj.get("first_name")
+    user.last_name = rj.get("last_name")
+    return user
+
+
 @app_views.route('/users', methods=['POST'], strict_slashes=False)
+@auth_policy(BASIC, SESSION)
 def create_user() -> str:
     """ POST /api/v1/users/
     JSON body:
@@ -69,27 +256,62 @@ def create_user() -> str:
         rj = request.get_json()
     except Exception as e:
         rj = None
-    if rj is None:
-        error_msg = "Wrong format"
-    if error_msg is None and rj.get("email", "") == "":
-        error_msg = "email missing"
-    if error_msg is None and rj.get("password", "") == "":
-        error_msg = "password missing"
+    error_msg = _user_json_error(rj)
     if error_msg is None:
         try:
-            user = User()
-            user.email = rj.get("email")
-            user.password = rj.get("password")
-            user.first_name = rj.get("first_name")
-            user.last_name = rj.get("last_name")
+            user = _user_from_json(rj)
             user.save()
-            return jsonify(user.to_json()), 201
+            return jsonify(user.to_json(raw_datetimes=True)), 201
         except Exception as e:
             error_msg = "Can't create User: {}".format(e)
     return jsonify({'error': error_msg}), 400
 
 
+@app_views.route('/users/batch', methods=['POST'], strict_slashes=False)
+@auth_policy(BASIC, SESSION)
+def create_users_batch() -> str:
+    """ POST /api/v1/users/batch
+    Body, read as a stream:
+      - JSON array of users (email, password, last_name and first_name
+        optional)
+      - or one user per line with Content-Type: application/x-ndjson
+    Return:
+      - list of results by position: {"index", "id"} for each created
+        User, {"index", "error"} for each invalid one
+      - 201 if at least one User was created, 400 otherwise
+      - 413 beyond MAX_BATCH_SIZE users
+    """
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        items = _iter_ndjson(request.stream)
+    else:
+        items = _iter_json_array(request.stream)
+
+    results = []
+    users = []
+    try:
+        for index, rj in enumerate(items):
+            if index >= MAX_BATCH_SIZE:
+                return jsonify({'error': "More than {} users".format(
+                    MAX_BATCH_SIZE)}), 413
+            error_msg = "Wrong format" if isinstance(rj, ValueError) \
+                else _user_json_error(rj)
+            if error_msg is not None:
+                results.append({"index": index, "error": error_msg})
+                continue
+            user = _user_from_json(rj)
+            users.append(user)
+            results.append({"index": index, "id": user.id})
+    except (ValueError, UnicodeDecodeError):
+        return jsonify({'error': "Wrong format"}), 400
+
+    if len(users) > 0:
+        # One write of the file store for the whole batch
+        User.save_many(users)
+    return jsonify(results), 201 if len(users) > 0 else 400
+
+
 @app_views.route('/users/<user_id>', methods=['PUT'], strict_slashes=False)
+@auth_policy(BASIC, SESSION)
 def update_user(user_id: str = None) -> str:
     """ PUT /api/v1/users/:id
     Path parameter:
@@ -119,4 +341,4 @@ def update_user(user_id: str = None) -> str:
     if rj.get('last_name') is not None:
         user.last_name = rj.get('last_name')
     user.save()
-    return jsonify(user.to_json()), 200
+    return jsonify(user.to_json(raw_datetimes=True)), 200
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+""" Basic Authorization header parsing: legacy chain vs fused parser
+
+Usage: python3 -m benchmarks.basic_header [N]
+"""
+import base64
+import sys
+import timeit
+from api.v1.auth.basic_auth import BasicAuth
+from api.v1.settings import Settings
+
+
+VALID = "Basic " + base64.b64encode(b"bob@hbtn.io:H0lbertonSchool98!") \
+    .decode('ascii')
+MALFORMED = [
+    None,
+    "Bearer abcdef",
+    "Basic ",
+    "Basic Ym9iQGhidG4uaW8",
+    "Basic Ym9i*GhidG4uaW8=",
+    "Basic " + base64.b64encode(b"no separator here").decode('ascii'),
+    "Basic " + base64.b64encode(b"\xff\xfe:pwd").decode('ascii'),
+    "Basic " + "A" * 100000,
+]
+
+
+def legacy(header: str):
+    """ The previous chain: prefix check, full b64decode, then split """
+    if header is None or not isinstance(header, str):
+        return None, None
+    if not header.startswith("Basic "):
+        return None, None
+    try:
+        decoded = base64.b64decode(header[len("Basic "):]).decode('utf-8')
+    except (base64.binascii.Error, UnicodeDecodeError):
+        return None, None
+    if ':' not in decoded:
+        return None, None
+    return decoded.split(':', 1)
+
+
+def best_of(func, number: int, repeat: int = 3) -> float:
+    """ Smallest of `repeat` timings """
+    return min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def run(n: int) -> dict:
+    """ Time `n` parses of valid and malformed headers """
+    ba = BasicAuth(Settings(auth_type="basic_auth"))
+    results = {}
+    for name, parse in (("legacy", legacy),
+                        ("fused", ba.parse_basic_authorization_header)):
+        valid = best_of(lambda: parse(VALID), n)
+        malformed = best_of(lambda: [parse(h) for h in MALFORMED],
+                            n // len(MALFORMED))
+        results[name] = {
+            "valid_per_s": round(n / valid),
+            "malformed_per_s": round(n // len(MALFORMED) * len(MALFORMED)
+                                     / malformed),
+        }
+    rejected = [ba.parse_basic_authorization_header(h)[2] for h in MALFORMED]
+    results["fused"]["reasons"] = rejected
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for name, stats in run(n).items():
+        print("{:<8} {}".format(name, stats))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+""" Benchmark of the serialization of GET /api/v1/users
+
+Compares, for N stored users, the stdlib encoding with Flask's defaults
+(strftime in to_json, sorted keys, ", " separators) with the encoders of
+api.v1.json_provider, and times the whole request with the cached
+payload dropped before each call.
+
+Usage: python3 -m benchmarks.json_encoding [--users 10000] [--number 5]
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import timeit
+from models import base
+from models.base import DATA
+from models.user import User
+import api.v1.app as api_app
+import api.v1.json_provider as json_provider
+from api.v1.views import users as users_views
+from api.v1.settings import Settings
+
+
+def populate(n: int):
+    """ Store `n` users in memory, without writing the file """
+    DATA["User"] = {}
+    users = []
+    for i in range(n):
+        user = User(email="user{}@hbtn.io".format(i),
+                    first_name="First", last_name=str(i))
+        user.password = "pwd{}".format(i)
+        users.append(user)
+    User.save_many(users)
+
+
+def legacy() -> str:
+    """ Encoding before the JSON provider """
+    return json.dumps([user.to_json() for user in User.all()],
+                      sort_keys=True)
+
+
+def stdlib() -> bytes:
+    """ Provider encoding, stdlib fallback """
+    orjson, json_provider.orjson = json_provider.orjson, None
+    try:
+        return json_provider.dumps_bytes(
+            [user.to_json(raw_datetimes=True) for user in User.all()])
+    finally:
+        json_provider.orjson = orjson
+
+
+def provider() -> bytes:
+    """ Provider encoding, with orjson if installed """
+    return json_provider.dumps_bytes(
+        [user.to_json(raw_datetimes=True) for user in User.all()])
+
+
+def main():
+    """ Time each encoding and print milliseconds per call """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    store_dir = tempfile.mkdtemp()
+    base.set_store_dir(store_dir)
+    api_app.settings = Settings(auth_type=None, login_rate_limit=0)
+    api_app.auth = None
+    client = api_app.app.test_client()
+
+    def request():
+        """ GET /api/v1/users with a cold payload cache """
+        users_views._PAYLOADS.clear()
+        return client.get("/api/v1/users")
+
+    try:
+        populate(args.users)
+        assert json.loads(legacy()) == json.loads(provider())
+        assert json.loads(stdlib()) == json.loads(provider())
+        print("{} users, orjson {}".format(
+            args.users, "installed" if json_provider.orjson else "missing"))
+        for name, func in (("legacy_stdlib", legacy),
+                           ("provider_stdlib", stdlib),
+                           ("provider", provider),
+                           ("get_users", request)):
+            ms = min(timeit.repeat(func, number=args.number, repeat=3)) \
+                / args.number * 1000
+            print("{:<16} {:>10.2f} ms  {:>10} bytes".format(
+                name, ms, len(func() if name != "get_users"
+                              else request().data)))
+    finally:
+        shutil.rmtree(store_dir)
+        DATA["User"] = {}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+""" Load test of the API, in-process, under each AUTH_TYPE
+
+Seeds users through `User.save`, then drives a weighted mix of requests
+with concurrent Flask test clients and writes throughput and latency
+percentiles as JSON, to compare runs across commits.
+
+Usage: python3 -m benchmarks.load [--users N] [--requests N]
+           [--concurrency N] [--mix status=4,users=1,user=4,login=1]
+           [--auth-types none,basic_auth,session_auth] [--output FILE]
+"""
+import argparse
+import base64
+import json
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from models import base
+from models.user import User
+import api.v1.app as api_app
+from api.v1.auth.basic_auth import BasicAuth
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.settings import Settings
+
+PASSWORD = "bench pwd"
+# No auth instance for "none": before_request lets every request through
+AUTH_CLASSES = {"none": None, "basic_auth": BasicAuth,
+                "session_auth": SessionAuth}
+
+
+def percentile(samples: List[float], rank: float) -> float:
+    """ Value at `rank` (0 to 1) of sorted samples, in milliseconds """
+    if not samples:
+        return None
+    index = min(len(samples) - 1, int(len(samples) * rank))
+    return round(samples[index] * 1000, 3)
+
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    """ Throughput and percentiles of a list of latencies """
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1)
+        if elapsed else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def seed(n: int) -> List[User]:
+    """ Create `n` users, each persisted with `User.save` """
+    User.load_from_file()
+    users = []
+    for i in range(n):
+        user = User()
+        user.email = "bench{}@hbtn.io".format(i)
+        user.password = PASSWORD
+        user.first_name = "Bench"
+        user.last_name = str(i)
+        user.save()
+        users.append(user)
+    return users
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """ Parse `name=weight,...` """
+    weights = {}
+    for item in mix.split(','):
+        name, weight = item.split('=')
+        weights[name.strip()] = int(weight)
+    return weights
+
+
+class Client():
+    """ A test client authenticated as one seeded user """
+
+    def __init__(self, auth_type: str, user: User):
+        """ Log in as `user` according to the auth type """
+        self.auth_type = auth_type
+        self.user = user
+        self.client = api_app.app.test_client()
+        self.headers = {}
+        if auth_type == "basic_auth":
+            credentials = "{}:{}".format(user.email, PASSWORD).encode()
+            self.headers["Authorization"] = "Basic {}".format(
+                base64.b64encode(credentials).decode())
+        elif auth_type == "session_auth":
+            self.login()
+
+    def login(self):
+        """ POST /api/v1/auth_session/login """
+        return self.client.post("/api/v1/auth_session/login", data={
+            "email": self.user.email, "password": PASSWORD})
+
+    def request(self, name: str, users: List[User]):
+        """ Send one request of the mix """
+        if name == "status":
+            return self.client.get("/api/v1/status", headers=self.headers)
+        if name == "users":
+            return self.client.get("/api/v1/users", headers=self.headers)
+        if name == "user":
+            return self.client.get("/api/v1/users/{}".format(
+                random.choice(users).id), headers=self.headers)
+        if name == "login":
+            return self.login()
+        raise ValueError("Unknown request {}".format(name))
+
+
+def run(auth_type: str, users: List[User], weights: Dict[str, int],
+        n_requests: int, concurrency: int) -> dict:
+    """ Drive the mix under one auth type """
+    settings = Settings(auth_type=None if auth_type == "none" else auth_type,
+                        login_rate_limit=0)
+    api_app.settings = settings
+    auth_class = AUTH_CLASSES[auth_type]
+    api_app.auth = auth_class(settings) if auth_class is not None else None
+    if auth_type != "session_auth":
+        # Logins only create sessions with SessionAuth
+        weights = {k: v for k, v in weights.items() if k != "login"}
+
+    names = list(weights)
+    latencies = {name: [] for name in names}
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(i: int):
+        """ One client sending its share of the requests """
+        rng = random.Random(i)
+        client = Client(auth_type, users[i % len(users)])
+        for _ in range(n_requests // concurrency):
+            name = rng.choices(names, [weights[n] for n in names])[0]
+            start = time.perf_counter()
+            response = client.request(name, users)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[name].append(elapsed)
+                statuses[response.status_code] = \
+                    statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    result = summarize([t for ts in latencies.values() for t in ts], elapsed)
+    result["statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+    result["endpoints"] = {name: summarize(ts, elapsed)
+                           for name, ts in latencies.items()}
+    return result
+
+
+def git_commit() -> str:
+    """ Current commit, to compare results across commits """
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """ Parse the arguments, run every auth type and write the report """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mix", default="status=4,users=1,user=4,login=1")
+    parser.add_argument("--auth-types", default="none,basic_auth,session_auth")
+    parser.add_argument("--output", default="bench_load.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    store_dir = tempfile.mkdtemp()
+    base.set_store_dir(store_dir)
+    try:
+        start = time.perf_counter()
+        users = seed(args.users)
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "parameters": vars(args),
+            "seed_s": round(time.perf_counter() - start, 3),
+            "results": {},
+        }
+        for auth_type in args.auth_types.split(','):
+            report["results"][auth_type] = run(
+                auth_type, users, parse_mix(args.mix), args.requests,
+                args.concurrency)
+    finally:
+        shutil.rmtree(store_dir)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for auth_type, result in report["results"].items():
+        print("{:<13} {:>8} rps  p50 {} ms  p95 {} ms  p99 {} ms  {}".format(
+            auth_type, result["throughput_rps"], result["p50_ms"],
+            result["p95_ms"], result["p99_ms"], result["statuses"]))
+
+
+if __name__ == "__main__":
+    main()
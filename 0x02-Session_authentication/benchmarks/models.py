@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+""" Micro-benchmarks of models.base and models.user at growing sizes
+
+For each number of stored users N, times one call of each operation
+(best of several runs) and measures memory with tracemalloc, so the
+O(n) paths show up as curves growing with N.
+
+Usage: python3 -m benchmarks.models [--sizes 1000,10000,100000,1000000]
+           [--output FILE]
+"""
+import argparse
+import gc
+import json
+import shutil
+import tempfile
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List
+from models import base
+from models.base import DATA
+from models.user import User
+
+
+def best(func: Callable, number: int, repeat: int = 3) -> float:
+    """ Best time of one call, in microseconds """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) \
+        / number * 1e6
+
+
+def populate(n: int) -> List[User]:
+    """ Store `n` users in memory, without writing the file """
+    DATA["User"] = {}
+    users = []
+    for i in range(n):
+        user = User(email="user{}@hbtn.io".format(i),
+                    first_name="First", last_name=str(i))
+        user.password = "pwd{}".format(i)
+        DATA["User"][user.id] = user
+        users.append(user)
+    return users
+
+
+def measure(n: int) -> Dict[str, float]:
+    """ Time every operation with `n` stored users """
+    gc.collect()
+    tracemalloc.start()
+    users = populate(n)
+    data_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    middle = users[n // 2]
+    as_json = middle.to_json(True)
+    # Calls per timing: many for O(1) operations, few for O(n) ones
+    fast, slow = 1000, max(1, 100000 // n)
+    result = {
+        "init_from_kwargs_us": best(lambda: User(**as_json), fast),
+        "to_json_us": best(lambda: middle.to_json(), fast),
+        "get_us": best(lambda: User.get(middle.id), fast),
+        "is_valid_password_us": best(
+            lambda: middle.is_valid_password("pwd"), fast),
+        "display_name_us": best(middle.display_name, fast),
+        "search_hit_us": best(
+            lambda: User.search({"email": middle.email}), slow),
+        "search_miss_us": best(
+            lambda: User.search({"email": "nobody@hbtn.io"}), slow),
+        "save_us": best(middle.save, slow, repeat=1),
+    }
+
+    result["load_from_file_us"] = best(User.load_from_file, 1, repeat=1)
+    # Memory in a separate run, tracemalloc slows allocations down
+    gc.collect()
+    tracemalloc.start()
+    User.load_from_file()
+    result["load_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result["data_bytes"] = data_bytes
+    result["bytes_per_user"] = round(data_bytes / n)
+    return {k: round(v, 3) if isinstance(v, float) else v
+            for k, v in result.items()}
+
+
+def main():
+    """ Run every size and print one row per operation """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    store_dir = tempfile.mkdtemp()
+    base.set_store_dir(store_dir)
+    try:
+        results = {size: measure(size) for size in sizes}
+    finally:
+        shutil.rmtree(store_dir)
+        DATA["User"] = {}
+
+    print("{:<22}".format("N") + "".join("{:>14}".format(s) for s in sizes))
+    for key in results[sizes[0]]:
+        print("{:<22}".format(key) + "".join(
+            "{:>14}".format(results[size][key]) for size in sizes))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
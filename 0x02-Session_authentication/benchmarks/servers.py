@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+""" Benchmark of the dev server against the gunicorn entry point
+
+Seeds users in a temporary store, starts each server on a local port,
+waits for /api/v1/readyz and drives a weighted mix of requests over
+keep-alive HTTP connections from concurrent threads.
+
+Usage: python3 -m benchmarks.servers [--users N] [--requests N]
+           [--concurrency N] [--workers N] [--threads N]
+           [--mix status=4,users=1,user=4] [--output FILE]
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from benchmarks.load import PASSWORD, git_commit, parse_mix, summarize
+from models import base
+from models.user import User
+
+
+def seed(n: int) -> List[User]:
+    """ Create `n` users, written to the store once """
+    User.load_from_file()
+    users = []
+    for i in range(n):
+        user = User(email="bench{}@hbtn.io".format(i),
+                    first_name="Bench", last_name=str(i))
+        user.password = PASSWORD
+        users.append(user)
+    User.save_many(users)
+    return users
+
+
+def wait_ready(port: int, timeout: float = 30.0):
+    """ Poll /api/v1/readyz until it answers 200 """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/v1/readyz")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("Server on port {} not ready".format(port))
+
+
+def drive(port: int, users: List[User], weights: Dict[str, int],
+          n_requests: int, concurrency: int) -> dict:
+    """ Send the mix with `concurrency` keep-alive clients """
+    credentials = "{}:{}".format(users[0].email, PASSWORD).encode()
+    headers = {"Authorization": "Basic {}".format(
+        base64.b64encode(credentials).decode())}
+    names = list(weights)
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def worker(i: int):
+        """ One client sending its share of the requests """
+        rng = random.Random(i)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        for _ in range(n_requests // concurrency):
+            name = rng.choices(names, [weights[n] for n in names])[0]
+            path = {"status": "/api/v1/status", "users": "/api/v1/users",
+                    "user": "/api/v1/users/{}".format(
+                        rng.choice(users).id)}[name]
+            start = time.perf_counter()
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status] = \
+                    statuses.get(response.status, 0) + 1
+        conn.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - start)
+    result["statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+    return result
+
+
+def main():
+    """ Run both servers and write the report """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--mix", default="status=4,users=1,user=4")
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--output", default="bench_servers.json")
+    args = parser.parse_args()
+
+    store_dir = tempfile.mkdtemp()
+    base.set_store_dir(store_dir)
+    env = dict(os.environ, STORE_DIR=store_dir, API_HOST="127.0.0.1",
+               API_PORT=str(args.port), AUTH_TYPE="basic_auth",
+               LOGIN_RATE_LIMIT="0", WORKERS=str(args.workers),
+               THREADS=str(args.threads))
+    servers = {
+        "dev": [sys.executable, "-m", "api.v1.app"],
+        "gunicorn": [sys.executable, "-m", "gunicorn", "-c",
+                     "gunicorn.conf.py", "--log-level", "warning",
+                     "wsgi:app"],
+    }
+    report = {"commit": git_commit(), "parameters": vars(args),
+              "results": {}}
+    try:
+        users = seed(args.users)
+        for name, command in servers.items():
+            server = subprocess.Popen(command, env=env,
+                                      stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL)
+            try:
+                wait_ready(args.port)
+                report["results"][name] = drive(
+                    args.port, users, parse_mix(args.mix), args.requests,
+                    args.concurrency)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait()
+    finally:
+        shutil.rmtree(store_dir)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for name, result in report["results"].items():
+        print("{:<9} {:>8} rps  p50 {} ms  p95 {} ms  p99 {} ms  {}".format(
+            name, result["throughput_rps"], result["p50_ms"],
+            result["p95_ms"], result["p99_ms"], result["statuses"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+""" Throughput of SessionAuth: in-memory store vs signed tokens
+
+Usage: python3 -m benchmarks.session_store [N]
+"""
+import sys
+import timeit
+import uuid
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.settings import Settings
+
+
+def run(n: int) -> dict:
+    """ Create then look up `n` sessions in each mode """
+    results = {}
+    user_ids = [str(uuid.uuid4()) for _ in range(n)]
+    for mode in ("memory", "signed"):
+        SessionAuth.user_id_by_session_id = {}
+        sa = SessionAuth(Settings(auth_type="session_auth", session_mode=mode,
+                                  session_secrets=("new-key", "old-key"),
+                                  session_duration=3600))
+        session_ids = []
+        create = timeit.timeit(
+            lambda: session_ids.extend(sa.create_session(u)
+                                       for u in user_ids), number=1)
+        lookup = timeit.timeit(
+            lambda: [sa.user_id_for_session_id(s) for s in session_ids],
+            number=1)
+        miss = timeit.timeit(
+            lambda: [sa.user_id_for_session_id(s + "x")
+                     for s in session_ids], number=1)
+        results[mode] = {
+            "create_per_s": round(n / create),
+            "lookup_per_s": round(n / lookup),
+            "miss_per_s": round(n / miss),
+            "store_size": len(SessionAuth.user_id_by_session_id),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for mode, stats in run(n).items():
+        print("{:<7} {}".format(mode, stats))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+""" gunicorn configuration of the API
+
+The app, and with it the users of the file store, is loaded once in the
+master process: the workers share `DATA` copy-on-write after the fork.
+SIGHUP reloads the users in the master, then replaces the workers
+gracefully.
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import gc
+from multiprocessing import cpu_count
+from api.v1.settings import Settings
+
+api_settings = Settings.from_env()
+
+bind = "{}:{}".format(api_settings.host, api_settings.port)
+workers = api_settings.workers or cpu_count() * 2 + 1
+threads = api_settings.threads
+worker_class = "gthread" if threads > 1 else "sync"
+preload_app = True
+graceful_timeout = 30
+
+
+def when_ready(server):
+    """ Keep the garbage collector off the pages of the loaded objects,
+    which would otherwise copy them in every worker
+    """
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """ Give each worker its own store token: their versions diverge from
+    the fork on, so their collection ETags must too
+    """
+    from api.v1.views.users import new_store_token
+    new_store_token()
+
+
+def on_reload(server):
+    """ Reload the users before forking the new workers
+    """
+    from models.user import User
+    gc.unfreeze()
+    User.load_from_file()
+    gc.collect()
+    gc.freeze()
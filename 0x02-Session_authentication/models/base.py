@@ -2,7 +2,8 @@
 """ Base module
 """
 from datetime import datetime
-from typing import TypeVar, List, Iterable
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, TypeVar, List, Iterable
 from os import path
 import json
 import uuid
@@ -10,6 +11,100 @@ import uuid
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+STORE_DIR = "."
+# Per class: number of changes of the store, and time of the last one
+VERSIONS = {}
+LAST_MODIFIED = {}
+# Per class: aggregates by name, see Base.register_aggregate
+AGGREGATES = {}
+
+
+def set_store_dir(store_dir: str):
+    """ Change the directory of the JSON file store
+    """
+    global STORE_DIR
+    STORE_DIR = store_dir
+
+
+def _touch(s_class: str, when: datetime):
+    """ Record a change of the store of a class
+    """
+    VERSIONS[s_class] = VERSIONS.get(s_class, 0) + 1
+    LAST_MODIFIED[s_class] = when
+
+
+class Aggregate():
+    """ Count of the objects of a class by group, updated by every save
+    and remove so reading it never scans DATA
+
+    `key(obj)` returns the group of an object, or None to leave it out.
+    The group of each object is kept, to move it out of its old group
+    when it is saved again.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable]):
+        """ Initialize an empty aggregate
+        """
+        self.key = key
+        self.counts: Dict[Hashable, int] = {}
+        self._groups: Dict[str, Hashable] = {}
+        self._lock = Lock()
+
+    def add(self, obj: TypeVar('Base')):
+        """ Count a saved object, in place of its previous version
+        """
+        group = self.key(obj)
+        with self._lock:
+            self._discard(obj.id)
+            if group is not None:
+                self._groups[obj.id] = group
+                self.counts[group] = self.counts.get(group, 0) + 1
+
+    def discard(self, obj: TypeVar('Base')):
+        """ Stop counting a removed object
+        """
+        with self._lock:
+            self._discard(obj.id)
+
+    def _discard(self, obj_id: str):
+        """ Move an object out of its group, the lock being held
+        """
+        group = self._groups.pop(obj_id, None)
+        if group is None:
+            return
+        if self.counts[group] == 1:
+            del self.counts[group]
+        else:
+            self.counts[group] -= 1
+
+    def reset(self, objs: Iterable[TypeVar('Base')] = ()):
+        """ Count `objs` from scratch
+        """
+        with self._lock:
+            self.counts, self._groups = {}, {}
+        for obj in objs:
+            self.add(obj)
+
+    def value(self) -> Any:
+        """ Number of objects of each group
+        """
+        with self._lock:
+            return dict(self.counts)
+
+
+class Count(Aggregate):
+    """ Number of objects matching a predicate
+    """
+
+    def __init__(self, predicate: Callable[[Any], bool]):
+        """ Initialize an empty count
+        """
+        super().__init__(lambda obj: True if predicate(obj) else None)
+
+    def value(self) -> int:
+        """ Number of matching objects
+        """
+        return self.counts.get(True, 0)
 
 
 class Base():
@@ -44,14 +139,18 @@ class Base():
             return False
         return (self.id == other.id)
 
-    def to_json(self, for_serialization: bool = False) -> dict:
+    def to_json(self, for_serialization: bool = False,
+                raw_datetimes: bool = False) -> dict:
         """ Convert the object a JSON dictionary
+
+        With `raw_datetimes`, datetimes are kept for an encoder formatting
+        them itself, like the one of api.v1.json_provider.
         """
         result = {}
         for key, value in self.__dict__.items():
             if not for_serialization and key[0] == '_':
                 continue
-            if type(value) is datetime:
+            if type(value) is datetime and not raw_datetimes:
                 result[key] = value.strftime(TIMESTAMP_FORMAT)
             else:
                 result[key] = value
@@ -62,22 +161,32 @@ class Base():
         """ Load all objects from file
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
+        file_path = path.join(STORE_DIR, ".db_{}.json".format(s_class))
         DATA[s_class] = {}
+        for aggregate in AGGREGATES.get(s_class, {}).values():
+            aggregate.reset()
         if not path.exists(file_path):
+            _touch(s_class, datetime.utcnow())
             return
 
         with open(file_path, 'r') as f:
             objs_json = json.load(f)
             for obj_id, obj_json in objs_json.items():
                 DATA[s_class][obj_id] = cls(**obj_json)
+        for aggregate in AGGREGATES.get(s_class, {}).values():
+            aggregate.reset(DATA[s_class].values())
+        # The file is written on every change, deletions included, so its
+        # mtime keeps Last-Modified from going back after a restart
+        _touch(s_class, max([datetime.utcfromtimestamp(
+            path.getmtime(file_path))] + [
+                obj.updated_at for obj in DATA[s_class].values()]))
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
+        file_path = path.join(STORE_DIR, ".db_{}.json".format(s_class))
         objs_json = {}
         for obj_id, obj in DATA[s_class].items():
             objs_json[obj_id] = obj.to_json(True)
@@ -91,16 +200,64 @@ class Base():
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
         DATA[s_class][self.id] = self
+        for aggregate in AGGREGATES.get(s_class, {}).values():
+            aggregate.add(self)
+        _touch(s_class, self.updated_at)
         self.__class__.save_to_file()
 
+    @classmethod
+    def save_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Save several objects, writing the file only once
+        """
+        s_class = cls.__name__
+        now = datetime.utcnow()
+        aggregates = AGGREGATES.get(s_class, {}).values()
+        for obj in objs:
+            obj.updated_at = now
+            DATA[s_class][obj.id] = obj
+            for aggregate in aggregates:
+                aggregate.add(obj)
+        _touch(s_class, now)
+        cls.save_to_file()
+
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
         if DATA[s_class].get(self.id) is not None:
             del DATA[s_class][self.id]
+            for aggregate in AGGREGATES.get(s_class, {}).values():
+                aggregate.discard(self)
+            _touch(s_class, datetime.utcnow())
             self.__class__.save_to_file()
 
+    @classmethod
+    def register_aggregate(cls, name: str, aggregate: Aggregate):
+        """ Keep `aggregate` up to date with the objects of the class,
+        starting from the loaded ones
+        """
+        s_class = cls.__name__
+        aggregate.reset(DATA.get(s_class, {}).values())
+        AGGREGATES.setdefault(s_class, {})[name] = aggregate
+
+    @classmethod
+    def aggregate(cls, name: str) -> Any:
+        """ Current value of a registered aggregate
+        """
+        return AGGREGATES[cls.__name__][name].value()
+
+    @classmethod
+    def version(cls) -> int:
+        """ Number of changes of the store, bumped by every save and remove
+        """
+        return VERSIONS.get(cls.__name__, 0)
+
+    @classmethod
+    def last_modified(cls) -> datetime:
+        """ Time of the last change of the store, None before loading it
+        """
+        return LAST_MODIFIED.get(cls.__name__)
+
     @classmethod
     def count(cls) -> int:
         """ Count all objects
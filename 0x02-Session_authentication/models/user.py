@@ -2,7 +2,7 @@
 """ User module
 """
 import hashlib
-from models.base import Base
+from models.base import Aggregate, Base, Count
 
 
 class User(Base):
@@ -57,3 +57,9 @@ class User(Base):
             return "{}".format(self.last_name)
         else:
             return "{} {}".format(self.first_name, self.last_name)
+
+
+User.register_aggregate("created_per_day", Aggregate(
+    lambda user: user.created_at.strftime("%Y-%m-%d")))
+User.register_aggregate("with_names", Count(
+    lambda user: user.first_name is not None or user.last_name is not None))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+""" Tests of the Basic Authorization header parser
+"""
+import base64
+import unittest
+from api.v1.auth import basic_auth
+from api.v1.auth.basic_auth import BasicAuth
+
+
+def header(credentials: bytes) -> str:
+    """ Basic header of raw credentials """
+    return "Basic " + base64.b64encode(credentials).decode()
+
+
+class TestParseBasicAuthorizationHeader(unittest.TestCase):
+    """ Tests of BasicAuth.parse_basic_authorization_header """
+
+    def setUp(self):
+        """ Parser under test """
+        self.parse = BasicAuth().parse_basic_authorization_header
+
+    def test_valid(self):
+        """ Email and password, the password may contain ':' """
+        self.assertEqual(self.parse(header(b"bob@hbtn.io:pw")),
+                         ("bob@hbtn.io", "pw", None))
+        self.assertEqual(self.parse(header(b"bob@hbtn.io:a:b")),
+                         ("bob@hbtn.io", "a:b", None))
+        self.assertEqual(self.parse(header("é:ü".encode())),
+                         ("é", "ü", None))
+
+    def test_reason_codes(self):
+        """ Each kind of invalid header has its reason code """
+        cases = {
+            None: basic_auth.MISSING_HEADER,
+            89: basic_auth.MISSING_HEADER,
+            "Bearer abcd": basic_auth.NOT_BASIC,
+            "basic " + header(b"a:b")[6:]: basic_auth.NOT_BASIC,
+            "Basic " + "A" * basic_auth.MAX_AUTHORIZATION_HEADER:
+                basic_auth.TOO_LONG,
+            "Basic abc": basic_auth.BAD_LENGTH,
+            "Basic ab!d": basic_auth.BAD_ALPHABET,
+            "Basic ab=d": basic_auth.BAD_ALPHABET,
+            header(b"\xff\xfe:x"): basic_auth.BAD_ENCODING,
+            header(b"no separator"): basic_auth.NO_SEPARATOR,
+        }
+        for value, reason in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(self.parse(value), (None, None, reason))
+
+    def test_legacy_methods(self):
+        """ The step by step methods agree with the parser """
+        auth = BasicAuth()
+        value = header(b"bob@hbtn.io:pw")
+        decoded = auth.decode_base64_authorization_header(
+            auth.extract_base64_authorization_header(value))
+        self.assertEqual(auth.extract_user_credentials(decoded),
+                         ("bob@hbtn.io", "pw"))
+        self.assertIsNone(auth.decode_base64_authorization_header("ab!d"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+""" Tests of the conditional GET of the users views
+"""
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from flask import Flask
+from models import base
+from models.base import DATA
+from models.user import User
+import api.v1.app as api_app
+from api.v1.settings import Settings
+from api.v1.views import users
+
+ETAG = "users-abc-3"
+LAST_MODIFIED = datetime(2024, 5, 1, 12, 0, 0, 500000)
+
+
+class TestNotModified(unittest.TestCase):
+    """ Tests of the 304 decision of _not_modified """
+
+    def not_modified(self, headers: dict, last_modified=LAST_MODIFIED):
+        """ Response of _not_modified to a request with `headers` """
+        with Flask(__name__).test_request_context(headers=headers):
+            return users._not_modified(ETAG, last_modified)
+
+    def test_no_validators(self):
+        """ Requests without validators get the full response """
+        self.assertIsNone(self.not_modified({}))
+
+    def test_if_none_match(self):
+        """ A matching ETag, weak or among others, gets a 304 """
+        for value in ('"{}"'.format(ETAG), 'W/"{}"'.format(ETAG),
+                      '"other", "{}"'.format(ETAG), '*'):
+            with self.subTest(value=value):
+                response = self.not_modified({"If-None-Match": value})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.get_etag(), (ETAG, False))
+                self.assertEqual(response.last_modified.replace(
+                    tzinfo=timezone.utc), LAST_MODIFIED.replace(
+                    microsecond=0, tzinfo=timezone.utc))
+        self.assertIsNone(self.not_modified({"If-None-Match": '"other"'}))
+
+    def test_if_modified_since(self):
+        """ A copy as recent as the last change, to the second, gets a
+        304 """
+        for delta, fresh in ((0, True), (1, True), (-1, False)):
+            since = LAST_MODIFIED.replace(microsecond=0) + \
+                timedelta(seconds=delta)
+            with self.subTest(delta=delta):
+                response = self.not_modified({
+                    "If-Modified-Since": since.strftime(
+                        "%a, %d %b %Y %H:%M:%S GMT")})
+                self.assertEqual(response is not None, fresh)
+        self.assertIsNone(self.not_modified({
+            "If-Modified-Since": "Wed, 01 May 2024 12:00:00 GMT"},
+            last_modified=None))
+
+    def test_if_none_match_wins(self):
+        """ If-None-Match decides alone when both are sent """
+        self.assertIsNone(self.not_modified({
+            "If-None-Match": '"other"',
+            "If-Modified-Since": "Wed, 01 May 2030 12:00:00 GMT"}))
+
+
+class TestUsersViews(unittest.TestCase):
+    """ Tests of the validators of GET /api/v1/users and
+    /api/v1/users/:id """
+
+    def setUp(self):
+        """ Empty store in a temporary directory, no authentication """
+        self.store_dir = tempfile.mkdtemp()
+        self.saved = (base.STORE_DIR, api_app.settings, api_app.auth)
+        base.set_store_dir(self.store_dir)
+        User.load_from_file()
+        api_app.settings = Settings(auth_type=None)
+        api_app.auth = None
+        self.client = api_app.app.test_client()
+
+    def tearDown(self):
+        """ Restore the store and the settings """
+        base.set_store_dir(self.saved[0])
+        api_app.settings, api_app.auth = self.saved[1:]
+        DATA["User"] = {}
+        users._PAYLOADS.clear()
+        shutil.rmtree(self.store_dir)
+
+    def add_user(self, email: str) -> User:
+        """ Save a new user """
+        user = User(email=email)
+        user.password = "pwd"
+        user.save()
+        return user
+
+    def test_collection(self):
+        """ The list is 304 until a user is saved """
+        self.add_user("bob@hbtn.io")
+        response = self.client.get("/api/v1/users")
+        etag = response.headers["ETag"]
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/api/v1/users",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        self.add_user("amy@hbtn.io")
+        response = self.client.get("/api/v1/users",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), 2)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_one_user(self):
+        """ A user is 304 until it is saved again """
+        user = self.add_user("bob@hbtn.io")
+        path = "/api/v1/users/{}".format(user.id)
+        response = self.client.get(path)
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+        for headers in ({"If-None-Match": etag},
+                        {"If-Modified-Since": last_modified}):
+            with self.subTest(headers=headers):
+                self.assertEqual(
+                    self.client.get(path, headers=headers).status_code, 304)
+
+        user.save()
+        self.assertEqual(self.client.get(
+            path, headers={"If-None-Match": etag}).status_code, 200)
+        self.assertEqual(self.client.get(
+            path, headers={"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_reload(self):
+        """ Reloading the store never moves Last-Modified back """
+        self.add_user("bob@hbtn.io")
+        before = User.last_modified()
+        User.load_from_file()
+        self.assertGreaterEqual(User.last_modified(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
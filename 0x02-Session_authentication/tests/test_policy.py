@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+""" Tests of the auth policies of the routes
+"""
+import unittest
+from flask import Flask
+from api.v1.auth.auth import Auth
+from api.v1.auth.policy import (BASIC, PUBLIC, SESSION, _excluded,
+                                auth_policy, endpoint_policies)
+
+
+def make_app() -> Flask:
+    """ App with public, protected and undecorated routes """
+    app = Flask(__name__)
+
+    @app.route('/api/v1/status')
+    @auth_policy(PUBLIC)
+    def status():
+        return ""
+
+    @app.route('/api/v1/users')
+    @auth_policy(BASIC, SESSION)
+    def users():
+        return ""
+
+    @app.route('/api/v1/users/<user_id>')
+    @auth_policy(BASIC)
+    def user(user_id):
+        return ""
+
+    @app.route('/api/v1/other')
+    def other():
+        return ""
+    return app
+
+
+class TestAuthPolicy(unittest.TestCase):
+    """ Tests of the auth_policy decorator """
+
+    def test_attribute(self):
+        """ The policy is attached to the view """
+        @auth_policy(BASIC, SESSION)
+        def view():
+            pass
+        self.assertEqual(view.auth_policy, frozenset((BASIC, SESSION)))
+
+    def test_invalid(self):
+        """ Unknown, missing or contradictory policies are rejected """
+        for policies in ((), ("token",), (PUBLIC, BASIC)):
+            with self.subTest(policies=policies):
+                with self.assertRaises(ValueError):
+                    auth_policy(*policies)
+
+
+class TestExcluded(unittest.TestCase):
+    """ Tests of _excluded """
+
+    def setUp(self):
+        """ Auth whose require_auth matches the paths """
+        self.auth = Auth()
+
+    def test_static_rule(self):
+        """ Static rules follow Auth.require_auth """
+        self.assertTrue(_excluded('/api/v1/status', self.auth,
+                                  ('/api/v1/status/',)))
+        self.assertTrue(_excluded('/api/v1/status', self.auth,
+                                  ('/api/v1/stat*',)))
+        self.assertFalse(_excluded('/api/v1/users', self.auth,
+                                   ('/api/v1/status/',)))
+
+    def test_variable_rule(self):
+        """ Rules with variables are excluded by a wildcard covering
+        their static prefix, undecided when a path may match some URLs """
+        rule = '/api/v1/users/<user_id>'
+        self.assertTrue(_excluded(rule, self.auth, ('/api/v1/*',)))
+        self.assertTrue(_excluded(rule, self.auth, ('/api/v1/users/*',)))
+        self.assertIsNone(_excluded(rule, self.auth, ('/api/v1/users/a*',)))
+        self.assertIsNone(_excluded(rule, self.auth, ('/api/v1/users/me',)))
+        self.assertFalse(_excluded(rule, self.auth, ('/api/v1/status/',
+                                                     '/api/v1/stats*')))
+
+
+class TestEndpointPolicies(unittest.TestCase):
+    """ Tests of endpoint_policies """
+
+    def setUp(self):
+        """ App and auth under test """
+        self.app = make_app()
+        self.auth = Auth()
+
+    def test_decorated(self):
+        """ Decorated endpoints get their policy, others are left out """
+        policies = endpoint_policies(self.app, self.auth,
+                                     ('/api/v1/status/',))
+        self.assertEqual(policies["status"], frozenset((PUBLIC,)))
+        self.assertEqual(policies["users"], frozenset((BASIC, SESSION)))
+        self.assertEqual(policies["user"], frozenset((BASIC,)))
+        self.assertNotIn("other", policies)
+
+    def test_wildcard_excluded_paths(self):
+        """ Endpoints whose URLs all match EXCLUDED_PATHS are public """
+        policies = endpoint_policies(self.app, self.auth, ('/api/v1/*',))
+        for endpoint in ("status", "users", "user"):
+            self.assertEqual(policies[endpoint], frozenset((PUBLIC,)))
+        self.assertNotIn("other", policies)
+
+    def test_partially_excluded(self):
+        """ Endpoints only some of whose URLs match are left out """
+        policies = endpoint_policies(self.app, self.auth,
+                                     ('/api/v1/users/me',))
+        self.assertNotIn("user", policies)
+        self.assertEqual(policies["users"], frozenset((BASIC, SESSION)))
+
+
+if __name__ == "__main__":
+    unittest.main()
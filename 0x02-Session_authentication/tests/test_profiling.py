@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+""" Tests of the profiling middleware
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from api.v1.profiling import ProfilerMiddleware
+from api.v1.settings import Settings
+
+
+def wsgi_app(environ, start_response):
+    """ App answering every request with a short body """
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+
+class TestProfilerMiddleware(unittest.TestCase):
+    """ Tests of ProfilerMiddleware """
+
+    def setUp(self):
+        """ Middleware profiling every request with the token """
+        self.profile_dir = tempfile.mkdtemp()
+        self.middleware = ProfilerMiddleware(wsgi_app, Settings(
+            profile_dir=self.profile_dir, profile_token="token"))
+
+    def tearDown(self):
+        """ Remove the profiles """
+        shutil.rmtree(self.profile_dir)
+
+    def request(self, token: str = "token") -> list:
+        """ GET /api/v1/users through the middleware """
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/api/v1/users",
+                   "HTTP_X_PROFILE_TOKEN": token}
+        return list(self.middleware(environ, lambda *args: None))
+
+    def test_one_file_per_request(self):
+        """ Requests to the same path in the same second keep their own
+        profile
+        """
+        for _ in range(3):
+            self.assertEqual(self.request(), [b"ok"])
+        names = os.listdir(self.profile_dir)
+        self.assertEqual(len(names), 3)
+        for name in names:
+            self.assertTrue(name.endswith(".GET.api_v1_users.prof"))
+
+    def test_wrong_token(self):
+        """ Requests with another token aren't profiled """
+        self.assertEqual(self.request("other"), [b"ok"])
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
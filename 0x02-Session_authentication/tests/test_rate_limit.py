@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+""" Tests of the sliding-window rate limiter
+"""
+import unittest
+from api.v1.auth.rate_limit import (MemoryRateLimiter, _estimate, _roll,
+                                    build_rate_limiter)
+from api.v1.settings import Settings
+
+LIMIT, WINDOW = 10, 60
+
+
+class TestEstimate(unittest.TestCase):
+    """ Tests of _estimate """
+
+    def test_under_limit(self):
+        """ A hit is allowed while the weighted count is under the limit """
+        self.assertEqual(_estimate(LIMIT, WINDOW, 30, 0, 5, 0), 0)
+        # 10 * (1 - 30 / 60) + 4 = 9
+        self.assertEqual(_estimate(LIMIT, WINDOW, 30, 0, 4, 10), 0)
+
+    def test_current_window_full(self):
+        """ A full window waits for the next one """
+        self.assertEqual(_estimate(LIMIT, WINDOW, 30, 0, 10, 0), 30)
+        self.assertEqual(_estimate(LIMIT, WINDOW, 30, 0, 10, 10), 30)
+
+    def test_previous_window_decays(self):
+        """ The wait ends when the previous window has decayed enough """
+        # 10 * (1 - 20 / 60) + 5 > 10, allowed again at 30 seconds
+        self.assertAlmostEqual(_estimate(LIMIT, WINDOW, 20, 0, 5, 10), 10)
+        self.assertEqual(_estimate(LIMIT, WINDOW, 30.001, 0, 5, 10), 0)
+
+
+class TestRoll(unittest.TestCase):
+    """ Tests of _roll """
+
+    def test_same_window(self):
+        """ Counters stay in the window containing `now` """
+        self.assertEqual(_roll(WINDOW, 119, 60, 3, 2), (60, 3, 2))
+
+    def test_next_window(self):
+        """ The current count becomes the previous one """
+        self.assertEqual(_roll(WINDOW, 125, 60, 3, 2), (120, 0, 3))
+
+    def test_idle_windows(self):
+        """ Both counts are dropped after a whole idle window """
+        self.assertEqual(_roll(WINDOW, 185, 60, 3, 2), (180, 0, 0))
+
+
+class TestMemoryRateLimiter(unittest.TestCase):
+    """ Tests of MemoryRateLimiter """
+
+    def test_limit(self):
+        """ The limit is reached after `limit` hits in a window """
+        limiter = MemoryRateLimiter(3, WINDOW)
+        for _ in range(3):
+            self.assertEqual(limiter.retry_after("k", now=10), 0)
+            limiter.hit("k", now=10)
+        self.assertEqual(limiter.retry_after("k", now=10), 50)
+        self.assertEqual(limiter.retry_after("other", now=10), 0)
+
+    def test_max_keys(self):
+        """ The least recently used key is dropped """
+        limiter = MemoryRateLimiter(1, WINDOW, max_keys=2)
+        for key in ("a", "b", "c"):
+            limiter.hit(key, now=10)
+        self.assertEqual(limiter.retry_after("a", now=10), 0)
+        self.assertGreater(limiter.retry_after("c", now=10), 0)
+
+
+class TestBuildRateLimiter(unittest.TestCase):
+    """ Tests of build_rate_limiter """
+
+    def test_opt_in(self):
+        """ Throttling is off unless LOGIN_RATE_LIMIT is set """
+        self.assertIsNone(build_rate_limiter(Settings.from_env({})))
+        limiter = build_rate_limiter(Settings.from_env({
+            "LOGIN_RATE_LIMIT": "5", "TRUSTED_PROXIES": "1"}))
+        self.assertIsInstance(limiter, MemoryRateLimiter)
+
+    def test_trusted_proxies(self):
+        """ TRUSTED_PROXIES is a count of proxies """
+        self.assertEqual(Settings.from_env({}).trusted_proxies, 0)
+        for value in ("-1", "x"):
+            with self.assertRaises(ValueError):
+                Settings.from_env({"TRUSTED_PROXIES": value})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+""" Tests of the signed session tokens
+"""
+import unittest
+from api.v1.auth.session_token import (DEFAULT_DURATION, SessionSigner,
+                                       _b64encode)
+from api.v1.settings import Settings
+
+
+class TestSessionSigner(unittest.TestCase):
+    """ Tests of SessionSigner """
+
+    def test_sign_verify(self):
+        """ A signed token verifies to its user ID and times """
+        signer = SessionSigner(["secret"])
+        token = signer.sign("user-1", now=1000)
+        self.assertEqual(signer.verify(token, now=1000),
+                         ("user-1", 1000, 1000 + DEFAULT_DURATION))
+
+    def test_tampered(self):
+        """ A modified or foreign token is rejected """
+        signer = SessionSigner(["secret"])
+        payload, signature = signer.sign("user-1").split('.')
+        other = SessionSigner(["secret"]).sign("user-2").split('.')[0]
+        self.assertIsNone(signer.verify("{}.{}".format(other, signature)))
+        self.assertIsNone(signer.verify(payload))
+        self.assertIsNone(signer.verify("{}.{}".format(payload, "AAAA")))
+        self.assertIsNone(signer.verify("!!.??"))
+        self.assertIsNone(signer.verify(None))
+        self.assertIsNone(
+            SessionSigner(["other"]).verify(signer.sign("user-1")))
+
+    def test_rotation(self):
+        """ Tokens of an old key verify while it is listed """
+        old = SessionSigner(["old"])
+        token = old.sign("user-1")
+        rotated = SessionSigner(["new", "old"])
+        self.assertEqual(rotated.verify(token)[0], "user-1")
+        self.assertIsNone(old.verify(rotated.sign("user-2")))
+        self.assertIsNone(SessionSigner(["new"]).verify(token))
+
+    def test_expiry(self):
+        """ A token is valid until `duration` seconds after issue """
+        signer = SessionSigner(["secret"], duration=60)
+        token = signer.sign("user-1", now=1000)
+        self.assertEqual(signer.verify(token, now=1059),
+                         ("user-1", 1000, 1060))
+        self.assertIsNone(signer.verify(token, now=1060))
+
+    def test_no_expiry(self):
+        """ Tokens always expire, those without expiry are rejected """
+        for duration in (0, -1, None):
+            with self.assertRaises(ValueError):
+                SessionSigner(["secret"], duration=duration)
+        signer = SessionSigner(["secret"])
+        payload = "{}|user-1|1000|0".format(signer._signing_kid).encode()
+        token = "{}.{}".format(_b64encode(payload), _b64encode(
+            signer._signature(b"secret", payload)))
+        self.assertIsNone(signer.verify(token, now=1000))
+
+    def test_settings(self):
+        """ Signed sessions can't be configured without expiry """
+        env = {"SESSION_MODE": "signed", "SESSION_SECRET": "secret"}
+        self.assertEqual(Settings.from_env(env).session_duration,
+                         DEFAULT_DURATION)
+        with self.assertRaises(ValueError):
+            Settings.from_env(dict(env, SESSION_DURATION="0"))
+
+    def test_invalid_arguments(self):
+        """ No key, or a separator in the user ID, raise ValueError """
+        with self.assertRaises(ValueError):
+            SessionSigner([])
+        with self.assertRaises(ValueError):
+            SessionSigner(["secret"]).sign("a|b")
+
+
+if __name__ == "__main__":
+    unittest.main()
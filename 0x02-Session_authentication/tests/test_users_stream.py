@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+""" Tests of the streamed parsing of POST /api/v1/users/batch bodies
+"""
+import io
+import json
+import unittest
+from unittest import mock
+from api.v1.views import users
+
+BODIES = [
+    b'[]',
+    b' [ ] ',
+    b'[{"email": "a@hbtn.io", "password": "pw"}]',
+    b' [ 1 , "a\\u00e9" ,{"x":[1, 2]}, 12345, true, null ]\n',
+    '["é", {"first_name": "Zoë"}, 10]'.encode(),
+]
+
+
+def parse(body: bytes, chunk_size: int) -> list:
+    """ Items of `body` read `chunk_size` bytes at a time """
+    with mock.patch.object(users, "STREAM_CHUNK_SIZE", chunk_size):
+        return list(users._iter_json_array(io.BytesIO(body)))
+
+
+class TestIterJsonArray(unittest.TestCase):
+    """ Tests of _iter_json_array """
+
+    def test_chunk_boundaries(self):
+        """ Items, numbers and UTF-8 characters split across chunks """
+        for body in BODIES:
+            for chunk_size in (1, 2, 3, 5, 7, 64 * 1024):
+                with self.subTest(body=body, chunk_size=chunk_size):
+                    self.assertEqual(parse(body, chunk_size),
+                                     json.loads(body))
+
+    def test_large_array(self):
+        """ Many items spanning many chunks """
+        items = [{"email": "u{}@hbtn.io".format(i), "password": "pw"}
+                 for i in range(5000)]
+        self.assertEqual(parse(json.dumps(items).encode(), 1000), items)
+
+    def test_invalid(self):
+        """ Truncated or malformed arrays raise ValueError """
+        for body in (b'', b'{}', b'[1,', b'[1 2]', b'[1,]', b'[,1]',
+                     b'[1', b'["a]', b'\xff[]'):
+            for chunk_size in (1, 64 * 1024):
+                with self.subTest(body=body, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        parse(body, chunk_size)
+
+    def test_max_item_size(self):
+        """ Items up to MAX_ITEM_SIZE are read, longer or unterminated ones
+        are rejected without reading the rest of the body
+        """
+        item = {"email": "a" * 80}
+        size = len(json.dumps(item))
+        with mock.patch.object(users, "MAX_ITEM_SIZE", size):
+            self.assertEqual(parse(json.dumps([item, item]).encode(), 7),
+                             [item, item])
+        stream = io.BytesIO(b'[{"email": "' + b"x" * 10 ** 6)
+        with mock.patch.object(users, "MAX_ITEM_SIZE", size - 1), \
+                mock.patch.object(users, "STREAM_CHUNK_SIZE", 1000):
+            with self.assertRaises(ValueError):
+                list(users._iter_json_array(stream))
+        self.assertLess(stream.tell(), 10 ** 4)
+
+    def test_lazy(self):
+        """ Items are yielded before the end of the body is read """
+        items = users._iter_json_array(io.BytesIO(b'[1, 2, oops'))
+        self.assertEqual(next(items), 1)
+        self.assertEqual(next(items), 2)
+        with self.assertRaises(ValueError):
+            next(items)
+
+
+class TestIterNdjson(unittest.TestCase):
+    """ Tests of _iter_ndjson """
+
+    def test_lines(self):
+        """ Each line is decoded, or replaced by its error """
+        items = list(users._iter_ndjson(io.BytesIO(
+            b'{"email": "a"}\n\n  [1]\r\n{oops\n2')))
+        self.assertEqual(items[:2], [{"email": "a"}, [1]])
+        self.assertIsInstance(items[2], ValueError)
+        self.assertEqual(items[3], 2)
+
+    def test_max_item_size(self):
+        """ Lines longer than MAX_ITEM_SIZE are rejected without reading
+        them whole
+        """
+        with mock.patch.object(users, "MAX_ITEM_SIZE", 8):
+            self.assertEqual(list(users._iter_ndjson(io.BytesIO(
+                b'"123456"\n"123456"'))), ["123456", "123456"])
+            stream = io.BytesIO(b'"' + b"x" * 10 ** 6)
+            with self.assertRaises(ValueError):
+                list(users._iter_ndjson(stream))
+            self.assertEqual(stream.tell(), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
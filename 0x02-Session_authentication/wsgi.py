@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+""" WSGI entry point of the API
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from api.v1.app import app
@@ -1,11 +1,46 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request
+import os
+import threading
+from flask import Flask, abort, jsonify, redirect, request
 from auth import Auth
 
 app = Flask(__name__)
 AUTH = Auth()
 
 
+PURGE_INTERVAL = float(os.getenv("RESET_TOKEN_PURGE_INTERVAL", "300"))
+# Set to stop the thread of `start_purge`
+PURGE_STOP = threading.Event()
+
+
+def purge_reset_tokens(interval: float) -> None:
+    """Delete the expired reset tokens every `interval` seconds, until
+    PURGE_STOP is set"""
+    while not PURGE_STOP.wait(interval):
+        try:
+            AUTH.purge_expired_reset_tokens()
+        except Exception as e:
+            app.logger.warning("Reset token purge failed: %s", e)
+
+
+def start_purge(interval: float = PURGE_INTERVAL) -> threading.Thread:
+    """Start purging the expired reset tokens in a daemon thread, None if
+    `interval` is 0"""
+    if interval <= 0:
+        return None
+    PURGE_STOP.clear()
+    thread = threading.Thread(target=purge_reset_tokens, args=(interval,),
+                              daemon=True)
+    thread.start()
+    return thread
+
+
+@app.teardown_appcontext
+def close_session(exception=None) -> None:
+    """Release the database session of the request thread"""
+    AUTH.close_session()
+
+
 @app.route("/", methods=["GET"])
 def welcome():
     """Return a JSON response with a welcome message"""
@@ -26,5 +61,77 @@ def users() -> str:
         return jsonify({"message": "email already registered"}), 400
 
 
+@app.route("/sessions", methods=["POST"], strict_slashes=False)
+def login() -> str:
+    """POST /sessions
+    Return:
+        - the email of the logged in user, with the session_id cookie,
+          401 on wrong credentials.
+    """
+    email, password = request.form.get("email"), request.form.get("password")
+    if not AUTH.valid_login(email, password):
+        abort(401)
+    session_id = AUTH.create_session(email)
+    response = jsonify({"email": email, "message": "logged in"})
+    response.set_cookie("session_id", session_id)
+    return response
+
+
+@app.route("/sessions", methods=["DELETE"], strict_slashes=False)
+def logout() -> str:
+    """DELETE /sessions
+    Return:
+        - redirect to /, 403 without a valid session.
+    """
+    user = AUTH.get_user_from_session_id(request.cookies.get("session_id"))
+    if user is None:
+        abort(403)
+    AUTH.destroy_session(user.id)
+    return redirect("/")
+
+
+@app.route("/profile", methods=["GET"], strict_slashes=False)
+def profile() -> str:
+    """GET /profile
+    Return:
+        - the email of the user of the session, 403 without one.
+    """
+    user = AUTH.get_user_from_session_id(request.cookies.get("session_id"))
+    if user is None:
+        abort(403)
+    return jsonify({"email": user.email})
+
+
+@app.route("/reset_password", methods=["POST"], strict_slashes=False)
+def get_reset_password_token() -> str:
+    """POST /reset_password
+    Return:
+        - the email and a reset token, 403 if the email is unknown.
+    """
+    email = request.form.get("email")
+    try:
+        reset_token = AUTH.get_reset_password_token(email)
+    except ValueError:
+        abort(403)
+    return jsonify({"email": email, "reset_token": reset_token})
+
+
+@app.route("/reset_password", methods=["PUT"], strict_slashes=False)
+def update_password() -> str:
+    """PUT /reset_password
+    Return:
+        - the email with a message, 403 if the reset token is invalid.
+    """
+    email = request.form.get("email")
+    reset_token = request.form.get("reset_token")
+    new_password = request.form.get("new_password")
+    try:
+        AUTH.update_password(reset_token, new_password)
+    except ValueError:
+        abort(403)
+    return jsonify({"email": email, "message": "Password updated"})
+
+
 if __name__ == "__main__":
+    start_purge()
     app.run(host="0.0.0.0", port=5000)
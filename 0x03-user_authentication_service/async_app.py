@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+ASGI version of app.py, built on Quart (the asyncio implementation of the
+Flask API) and AsyncAuth.
+
+Run it with an ASGI server, e.g. `hypercorn async_app:app`.
+"""
+from quart import Quart, abort, jsonify, redirect, request
+from async_auth import AsyncAuth
+
+app = Quart(__name__)
+AUTH = AsyncAuth()
+
+
+@app.before_serving
+async def setup() -> None:
+    """Prepare the database before the first request"""
+    await AUTH.setup()
+
+
+@app.route("/", methods=["GET"])
+async def welcome():
+    """Return a JSON response with a welcome message"""
+    return jsonify({"message": "Bienvenue"})
+
+
+@app.route("/users", methods=["POST"], strict_slashes=False)
+async def users() -> str:
+    """POST /users
+    Return:
+        - return the string.
+    """
+    form = await request.form
+    email, password = form.get("email"), form.get("password")
+    try:
+        await AUTH.register_user(email, password)
+        return jsonify({"email": email, "message": "user created"})
+    except ValueError:
+        return jsonify({"message": "email already registered"}), 400
+
+
+@app.route("/sessions", methods=["POST"], strict_slashes=False)
+async def login() -> str:
+    """POST /sessions
+    Return:
+        - the email of the logged in user, with the session_id cookie,
+          401 on wrong credentials.
+    """
+    form = await request.form
+    email, password = form.get("email"), form.get("password")
+    if not await AUTH.valid_login(email, password):
+        abort(401)
+    session_id = await AUTH.create_session(email)
+    response = jsonify({"email": email, "message": "logged in"})
+    response.set_cookie("session_id", session_id)
+    return response
+
+
+@app.route("/sessions", methods=["DELETE"], strict_slashes=False)
+async def logout() -> str:
+    """DELETE /sessions
+    Return:
+        - redirect to /, 403 without a valid session.
+    """
+    user = await AUTH.get_user_from_session_id(
+        request.cookies.get("session_id"))
+    if user is None:
+        abort(403)
+    await AUTH.destroy_session(user.id)
+    return redirect("/")
+
+
+@app.route("/profile", methods=["GET"], strict_slashes=False)
+async def profile() -> str:
+    """GET /profile
+    Return:
+        - the email of the user of the session, 403 without one.
+    """
+    user = await AUTH.get_user_from_session_id(
+        request.cookies.get("session_id"))
+    if user is None:
+        abort(403)
+    return jsonify({"email": user.email})
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5000)
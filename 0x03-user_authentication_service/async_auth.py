@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Async Auth module, the asyncio counterpart of the Auth module.
+"""
+import asyncio
+import os
+from typing import Optional
+from bcrypt import checkpw
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import NoResultFound
+from async_db import AsyncDB
+from auth import (DEFAULT_BCRYPT_ROUNDS, DEFAULT_SESSION_CACHE_TTL,
+                  _SessionCache, _dummy_hash, _generate_uuid, _hash_password,
+                  _snapshot)
+from user import User
+
+
+class AsyncAuth:
+    """AsyncAuth class to interact with the authentication database.
+
+    bcrypt runs in the default executor, so hashing never blocks the
+    event loop.
+    """
+
+    def __init__(self, db: AsyncDB = None, rounds: int = None,
+                 session_cache_ttl: float = None):
+        """Initializes the AsyncAuth class with an AsyncDB instance.
+
+        Args:
+            db (AsyncDB): The database to use, configured from the
+                environment when not given.
+            rounds (int): bcrypt work factor of new hashes, defaults to the
+                BCRYPT_ROUNDS environment variable or 12.
+            session_cache_ttl (float): Seconds a session is served from
+                memory, defaults to the SESSION_CACHE_TTL environment
+                variable or 60; 0 disables the cache.
+        """
+        self._db = db if db is not None else AsyncDB()
+        if rounds is None:
+            rounds = int(os.getenv("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS))
+        self._rounds = rounds
+        if session_cache_ttl is None:
+            session_cache_ttl = float(os.getenv("SESSION_CACHE_TTL",
+                                                DEFAULT_SESSION_CACHE_TTL))
+        self._sessions = _SessionCache(session_cache_ttl)
+
+    async def setup(self) -> None:
+        """Prepares the database schema."""
+        await self._db.setup()
+
+    async def register_user(self, email: str, password: str) -> User:
+        """
+        Registers a new user by adding their email and hashed password
+        to the database.
+
+        Args:
+            email (str): The user's email.
+            password (str): The user's password.
+
+        Returns:
+            User: The newly created User object.
+
+        Raises:
+            ValueError: If a user with the given email already exists.
+        """
+        loop = asyncio.get_running_loop()
+        hashed_password = await loop.run_in_executor(
+            None, _hash_password, password, self._rounds)
+        try:
+            return await self._db.add_user(email,
+                                           hashed_password.decode('utf-8'))
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """
+        Validates user login.
+
+        Args:
+            email (str): The user's email.
+            password (str): The user's password.
+
+        Returns:
+            bool: True if the login is valid, False otherwise.
+        """
+        if not isinstance(email, str) or not isinstance(password, str):
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            # Same cost as a known email, see Auth.valid_login
+            await loop.run_in_executor(
+                None, checkpw, password.encode('utf-8'),
+                _dummy_hash(self._rounds))
+            return False
+        return await loop.run_in_executor(
+            None, checkpw, password.encode('utf-8'),
+            user.hashed_password.encode('utf-8'))
+
+    async def create_session(self, email: str) -> Optional[str]:
+        """
+        Creates a session for a user.
+
+        Args:
+            email (str): The user's email.
+
+        Returns:
+            str: The new session ID, None if the email is unknown.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+        session_id = _generate_uuid()
+        snapshot = _snapshot(user, session_id=session_id)
+        await self._db.update_user(user.id, session_id=session_id)
+        self._sessions.put(session_id, snapshot)
+        return session_id
+
+    async def get_user_from_session_id(self, session_id: str
+                                       ) -> Optional[User]:
+        """
+        Finds the user of a session, from memory when it is cached and
+        through the indexed session_id column otherwise.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            User: The user, None if no user has this session.
+        """
+        if session_id is None:
+            return None
+        user = self._sessions.get(session_id)
+        if user is not None:
+            return user
+        epoch = self._sessions.epoch()
+        try:
+            user = await self._db.find_user_by(session_id=session_id)
+        except NoResultFound:
+            return None
+        user = _snapshot(user)
+        self._sessions.put(session_id, user, since=epoch)
+        return user
+
+    async def destroy_session(self, user_id: int) -> None:
+        """
+        Ends the session of a user.
+
+        Args:
+            user_id (int): The user's ID.
+        """
+        if user_id is None:
+            return
+        try:
+            await self._db.update_user(user_id, session_id=None)
+        except NoResultFound:
+            pass
+        # After the write, see Auth.destroy_session
+        self._sessions.discard(user_id)
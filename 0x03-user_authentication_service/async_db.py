@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Async DB module, the asyncio counterpart of the DB module
+"""
+import os
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.pool import StaticPool
+from db import (DEFAULT_DB_URL, IN_MEMORY_DB_URL, _column_names, _lookup,
+                _set_sqlite_pragmas, migrate)
+from user import User
+
+
+def _async_url(url: str) -> str:
+    """Use the aiosqlite driver for SQLite URLs
+    """
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+class AsyncDB:
+    """AsyncDB class for handling database operations from coroutines
+
+    Every operation runs in its own AsyncSession, so concurrent tasks
+    never share one. Call `setup` once before using it.
+    """
+
+    def __init__(self, url: str = None, echo: bool = None) -> None:
+        """Initialize a new AsyncDB instance
+
+        Args:
+            url (str): Database URL, defaults to the DB_URL environment
+                variable or sqlite:///a.db
+            echo (bool): Log the SQL statements, defaults to the DB_ECHO
+                environment variable
+        """
+        if url is None:
+            url = os.getenv("DB_URL", DEFAULT_DB_URL)
+        if echo is None:
+            echo = os.getenv("DB_ECHO", "").lower() in ("1", "true", "yes")
+        in_memory = url in (IN_MEMORY_DB_URL, "sqlite:///:memory:")
+        options = {}
+        if in_memory:
+            options["poolclass"] = StaticPool
+        self._engine = create_async_engine(_async_url(url), echo=echo,
+                                           **options)
+        if url.startswith("sqlite") and not in_memory:
+            event.listen(self._engine.sync_engine, "connect",
+                         _set_sqlite_pragmas)
+        self._sessionmaker = sessionmaker(bind=self._engine,
+                                          class_=AsyncSession,
+                                          expire_on_commit=False)
+
+    @classmethod
+    def in_memory(cls, echo: bool = False) -> "AsyncDB":
+        """Create an AsyncDB living in memory, for tests and benchmarks
+        """
+        return cls(IN_MEMORY_DB_URL, echo=echo)
+
+    async def setup(self) -> None:
+        """Bring the schema up to date, keeping the existing data
+        """
+        async with self._engine.begin() as conn:
+            await conn.run_sync(migrate)
+
+    async def close(self) -> None:
+        """Close the connections of the pool
+        """
+        await self._engine.dispose()
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """Add a user to the database
+
+        Args:
+            email (str): The email of the user
+            hashed_password (str): The hashed password of the user
+
+        Returns:
+            User: The created User object
+
+        Raises:
+            IntegrityError: If a user with the same email already exists
+        """
+        new_user = User(email=email, hashed_password=hashed_password)
+        async with self._sessionmaker() as session:
+            session.add(new_user)
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                raise
+        return new_user
+
+    async def find_user_by(self, **kwargs) -> User:
+        """Find a user by arbitrary keyword arguments
+
+        Args:
+            kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            User: The first user found that matches the filters
+
+        Raises:
+            NoResultFound: If no user is found
+            InvalidRequestError: If invalid query arguments are passed
+        """
+        columns = _column_names(User)
+        for key in kwargs:
+            if key not in columns:
+                raise InvalidRequestError(
+                    f"Invalid request: {key} is not a column of User")
+
+        async with self._sessionmaker() as session:
+            try:
+                result = await session.execute(*_lookup(User, kwargs))
+            except Exception as e:
+                raise InvalidRequestError(f"Invalid request: {e}")
+            user = result.scalars().first()
+        if user is None:
+            raise NoResultFound("No user found with the provided filters.")
+        return user
+
+    async def update_user(self, user_id: int, **kwargs) -> int:
+        """Update a user’s attributes with a single UPDATE statement
+
+        Args:
+            user_id (int): The ID of the user to update
+            kwargs: Arbitrary keyword arguments of attributes to update
+
+        Returns:
+            int: The number of updated rows
+
+        Raises:
+            ValueError: If any argument does not correspond to a user attribute
+            NoResultFound: If no user has this ID
+        """
+        columns = _column_names(User)
+        for key in kwargs:
+            if key not in columns:
+                raise ValueError(f"{key} is not a valid attribute of User")
+        if not kwargs:
+            await self.find_user_by(id=user_id)
+            return 0
+
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                User.__table__.update().where(User.id == user_id)
+                .values(**kwargs))
+            await session.commit()
+        if result.rowcount == 0:
+            raise NoResultFound("No user found with the provided filters.")
+        return result.rowcount
@@ -3,23 +3,186 @@
 Auth module to handle user authentication and registration.
 """
 
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
 from db import DB
 from user import User
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError
 from bcrypt import hashpw, gensalt, checkpw
 
+DEFAULT_BCRYPT_ROUNDS = 12
+DEFAULT_SESSION_CACHE_TTL = 60
+DEFAULT_RESET_TOKEN_TTL = 900
+# Login durations kept per outcome for `Auth.login_latency_stats`
+LATENCY_SAMPLES = 1000
 
-def _hash_password(password: str) -> bytes:
+
+def _hash_password(password: str, rounds: int = DEFAULT_BCRYPT_ROUNDS
+                   ) -> bytes:
     """Hashes a password using bcrypt."""
-    return hashpw(password.encode('utf-8'), gensalt())
+    return hashpw(password.encode('utf-8'), gensalt(rounds))
+
+
+@lru_cache(maxsize=4)
+def _dummy_hash(rounds: int) -> bytes:
+    """Hash of a random password for a work factor, checked against when
+    the email is unknown so that failed logins all cost one bcrypt check.
+    Cached per work factor, so a new one is made when it changes."""
+    return _hash_password(os.urandom(16).hex(), rounds)
+
+
+def _percentile(samples: list, rank: float) -> float:
+    """Value at `rank` (0 to 1) of sorted samples."""
+    return samples[min(len(samples) - 1, int(len(samples) * rank))]
+
+
+def _generate_uuid() -> str:
+    """Returns a new UUID as a string."""
+    return str(uuid.uuid4())
+
+
+def _hash_token(token: str) -> str:
+    """SHA-256 of a reset token, the form in which it is stored."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _snapshot(user: User, **changes) -> User:
+    """Copy of the column values of a user, bound to no session, so it can
+    be cached and read from any thread."""
+    values = {column.key: getattr(user, column.key)
+              for column in User.__table__.columns}
+    values.update(changes)
+    return User(**values)
+
+
+class _SessionCache:
+    """Write-through cache of session ID -> user snapshot, with a TTL that
+    bounds how stale it can be when another process changes a session.
+
+    Each `discard` leaves a tombstone numbered by an epoch, so a lookup
+    that read the database before a logout can't cache the ended session
+    again (see `epoch` and `put`)."""
+
+    def __init__(self, ttl: float, max_size: int = 100000):
+        """Initializes an empty cache."""
+        self._ttl = ttl
+        self._max_size = max_size
+        self._users: OrderedDict = OrderedDict()
+        self._session_by_user: Dict[int, str] = {}
+        self._epoch = 0
+        # user ID -> epoch of its last discard, the oldest pruned first
+        self._tombstones: OrderedDict = OrderedDict()
+        # Latest epoch of the pruned tombstones
+        self._floor = 0
+        self._lock = Lock()
+
+    def epoch(self) -> int:
+        """Current epoch, to pass to `put` after reading the database."""
+        return self._epoch
+
+    def get(self, session_id: str) -> Optional[User]:
+        """Returns the cached user of a session, None if absent or
+        expired."""
+        entry = self._users.get(session_id)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if time.monotonic() >= expires_at:
+            with self._lock:
+                if self._users.get(session_id) is entry:
+                    self._discard(user.id)
+            return None
+        return user
+
+    def put(self, session_id: str, user: User, since: int = None) -> None:
+        """Caches the user of a session, replacing its previous session.
+
+        With `since`, the epoch read before looking the user up, nothing
+        is cached if the user's session was discarded in the meantime."""
+        if self._ttl <= 0:
+            return
+        with self._lock:
+            if since is not None and max(
+                    self._floor, self._tombstones.get(user.id, 0)) > since:
+                return
+            self._discard(user.id)
+            self._users[session_id] = (user, time.monotonic() + self._ttl)
+            self._session_by_user[user.id] = session_id
+            if len(self._users) > self._max_size:
+                oldest, (oldest_user, _) = self._users.popitem(last=False)
+                self._session_by_user.pop(oldest_user.id, None)
+
+    def discard(self, user_id: int) -> None:
+        """Forgets the session of a user, leaving a tombstone."""
+        with self._lock:
+            self._discard(user_id)
+            self._epoch += 1
+            self._tombstones[user_id] = self._epoch
+            self._tombstones.move_to_end(user_id)
+            if len(self._tombstones) > self._max_size:
+                _, epoch = self._tombstones.popitem(last=False)
+                self._floor = max(self._floor, epoch)
+
+    def _discard(self, user_id: int) -> None:
+        """`discard`, with the lock held."""
+        session_id = self._session_by_user.pop(user_id, None)
+        if session_id is not None:
+            self._users.pop(session_id, None)
 
 
 class Auth:
     """Auth class to interact with the authentication database."""
 
-    def __init__(self):
-        """Initializes the Auth class with a DB instance."""
-        self._db = DB()
+    def __init__(self, db: DB = None, rounds: int = None,
+                 constant_time_login: bool = True,
+                 session_cache_ttl: float = None,
+                 reset_token_ttl: int = None):
+        """Initializes the Auth class with a DB instance.
+
+        Args:
+            db (DB): The database to use, configured from the environment
+                when not given.
+            rounds (int): bcrypt work factor of new hashes, defaults to the
+                BCRYPT_ROUNDS environment variable or 12.
+            constant_time_login (bool): Check passwords of unknown emails
+                against a dummy hash, so they take as long as known ones.
+            session_cache_ttl (float): Seconds a session is served from
+                memory, defaults to the SESSION_CACHE_TTL environment
+                variable or 60; 0 disables the cache.
+            reset_token_ttl (int): Seconds a reset token stays valid,
+                defaults to the RESET_TOKEN_TTL environment variable or 900.
+        """
+        self._db = db if db is not None else DB()
+        if rounds is None:
+            rounds = int(os.getenv("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS))
+        self._rounds = rounds
+        self._constant_time_login = constant_time_login
+        if constant_time_login:
+            _dummy_hash(rounds)  # Made now rather than on a first login
+        self._login_latencies = {
+            "known": deque(maxlen=LATENCY_SAMPLES),
+            "unknown": deque(maxlen=LATENCY_SAMPLES),
+        }
+        if session_cache_ttl is None:
+            session_cache_ttl = float(os.getenv("SESSION_CACHE_TTL",
+                                                DEFAULT_SESSION_CACHE_TTL))
+        self._sessions = _SessionCache(session_cache_ttl)
+        if reset_token_ttl is None:
+            reset_token_ttl = int(os.getenv("RESET_TOKEN_TTL",
+                                            DEFAULT_RESET_TOKEN_TTL))
+        self._reset_token_ttl = reset_token_ttl
+
+    def close_session(self) -> None:
+        """Releases the database session of the current thread."""
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -36,16 +199,58 @@ class Auth:
         Raises:
             ValueError: If a user with the given email already exists.
         """
+        hashed_password = _hash_password(password, self._rounds)
         try:
-            # Check if user already exists
-            self._db.find_user_by(email=email)
+            # A single INSERT, the unique index on email rejects duplicates
+            return self._db.add_user(email, hashed_password.decode('utf-8'))
+        except IntegrityError:
             raise ValueError(f"User {email} already exists")
-        except NoResultFound:
-            # If user does not exist, create a new user
-            hashed_password = _hash_password(password)
-            new_user = self._db.add_user(email,
-                                         hashed_password.decode('utf-8'))
-            return new_user
+
+    def register_users(self, credentials: Iterable[Tuple[str, str]],
+                       workers: int = None) -> Dict[int, str]:
+        """
+        Registers many users at once.
+
+        Emails already registered or repeated in `credentials` are left
+        out before hashing, the passwords are hashed in parallel (bcrypt
+        releases the GIL) and the users are inserted in bulk.
+
+        Args:
+            credentials (Iterable[Tuple[str, str]]): (email, password)
+                pairs.
+            workers (int): Number of hashing threads, defaults to the
+                ThreadPoolExecutor default.
+
+        Returns:
+            Dict[int, str]: Error message of each user that couldn't be
+            registered, by position in `credentials`.
+        """
+        credentials = list(credentials)
+        failures = {}
+        existing = self._db.find_existing_emails(
+            email for email, _ in credentials if isinstance(email, str))
+        pending = []
+        for index, (email, password) in enumerate(credentials):
+            if not isinstance(email, str) or not email:
+                failures[index] = "email missing"
+            elif not isinstance(password, str) or not password:
+                failures[index] = "password missing"
+            elif email in existing:
+                failures[index] = f"User {email} already exists"
+            else:
+                existing.add(email)
+                pending.append((index, email, password))
+
+        with ThreadPoolExecutor(workers) as pool:
+            hashed = list(pool.map(partial(_hash_password,
+                                           rounds=self._rounds),
+                                   (password for _, _, password in pending)))
+
+        rows = [(email, hashed_password.decode('utf-8'))
+                for (_, email, _), hashed_password in zip(pending, hashed)]
+        for position, error in self._db.add_users_bulk(rows).items():
+            failures[pending[position][0]] = error
+        return dict(sorted(failures.items()))
 
     def valid_login(self, email: str, password: str) -> bool:
         """
@@ -58,12 +263,162 @@ class Auth:
         Returns:
             bool: True if the login is valid, False otherwise.
         """
+        if not isinstance(email, str) or not isinstance(password, str):
+            return False
+        start = time.perf_counter()
         try:
             user = self._db.find_user_by(email=email)
-            # Check if the provided password matches the stored hashed password
-            if checkpw(password.encode('utf-8'),
-                       user.hashed_password.encode('utf-8')):
-                return True
-            return False
         except NoResultFound:
+            if self._constant_time_login:
+                checkpw(password.encode('utf-8'), _dummy_hash(self._rounds))
+            self._login_latencies["unknown"].append(
+                time.perf_counter() - start)
             return False
+        # Check if the provided password matches the stored hashed password
+        valid = checkpw(password.encode('utf-8'),
+                        user.hashed_password.encode('utf-8'))
+        self._login_latencies["known"].append(time.perf_counter() - start)
+        return valid
+
+    def create_session(self, email: str) -> Optional[str]:
+        """
+        Creates a session for a user.
+
+        Args:
+            email (str): The user's email.
+
+        Returns:
+            str: The new session ID, None if the email is unknown.
+        """
+        try:
+            user = self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+        session_id = _generate_uuid()
+        snapshot = _snapshot(user, session_id=session_id)
+        self._db.update_user(user.id, session_id=session_id)
+        self._sessions.put(session_id, snapshot)
+        return session_id
+
+    def get_user_from_session_id(self, session_id: str) -> Optional[User]:
+        """
+        Finds the user of a session, from memory when it is cached and
+        through the indexed session_id column otherwise.
+
+        Args:
+            session_id (str): The session ID.
+
+        Returns:
+            User: The user, None if no user has this session.
+        """
+        if session_id is None:
+            return None
+        user = self._sessions.get(session_id)
+        if user is not None:
+            return user
+        epoch = self._sessions.epoch()
+        try:
+            user = self._db.find_user_by(session_id=session_id)
+        except NoResultFound:
+            return None
+        user = _snapshot(user)
+        self._sessions.put(session_id, user, since=epoch)
+        return user
+
+    def destroy_session(self, user_id: int) -> None:
+        """
+        Ends the session of a user.
+
+        Args:
+            user_id (int): The user's ID.
+        """
+        if user_id is None:
+            return
+        try:
+            self._db.update_user(user_id, session_id=None)
+        except NoResultFound:
+            pass
+        # After the write: a lookup reading the old row meanwhile finds
+        # the tombstone and doesn't cache it
+        self._sessions.discard(user_id)
+
+    def get_reset_password_token(self, email: str) -> str:
+        """
+        Creates a password reset token for a user. Only its hash is
+        stored, with an expiry time.
+
+        Args:
+            email (str): The user's email.
+
+        Returns:
+            str: The reset token.
+
+        Raises:
+            ValueError: If no user has this email.
+        """
+        try:
+            user = self._db.find_user_by(email=email)
+        except NoResultFound:
+            raise ValueError(f"No user found with email {email}")
+        reset_token = _generate_uuid()
+        self._db.add_reset_token(user.id, _hash_token(reset_token),
+                                 int(time.time()) + self._reset_token_ttl)
+        return reset_token
+
+    def update_password(self, reset_token: str, password: str) -> None:
+        """
+        Sets a new password with a reset token, which can't be used again.
+
+        Args:
+            reset_token (str): The reset token.
+            password (str): The new password.
+
+        Raises:
+            ValueError: If the token or the password is missing, or the
+                token is unknown or expired.
+        """
+        if not isinstance(reset_token, str) or not reset_token:
+            raise ValueError("Reset token missing")
+        if not isinstance(password, str) or not password:
+            raise ValueError("Password missing")
+        # Hashed first, so a failure can't cost the user their token
+        hashed_password = _hash_password(password, self._rounds)
+        try:
+            user_id = self._db.consume_reset_token(_hash_token(reset_token),
+                                                   int(time.time()))
+        except NoResultFound:
+            raise ValueError("Invalid reset token")
+        self._db.update_user(user_id,
+                             hashed_password=hashed_password.decode('utf-8'))
+
+    def purge_expired_reset_tokens(self) -> int:
+        """
+        Deletes the expired reset tokens, in small transactions.
+
+        Returns:
+            int: The number of deleted tokens.
+        """
+        return self._db.purge_expired_reset_tokens(int(time.time()))
+
+    def login_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Latency of the recent `valid_login` calls, for known and unknown
+        emails. With constant-time logins both should be alike.
+
+        Returns:
+            dict: count, mean, p50, p95 and p99 in milliseconds by outcome.
+        """
+        stats = {}
+        for outcome, latencies in self._login_latencies.items():
+            samples = sorted(latencies)
+            if not samples:
+                stats[outcome] = {"count": 0}
+                continue
+            stats[outcome] = {
+                "count": len(samples),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+                "p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+                "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+                "p99_ms": round(_percentile(samples, 0.99) * 1000, 2),
+            }
+        return stats
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Bulk user import against the one-user-at-a-time loop.
+
+Usage: python3 -m benchmarks.bulk_import [USERS_WITH_BCRYPT] [ROWS]
+"""
+import sys
+import time
+from auth import Auth
+from db import DB
+
+HASHED_PASSWORD = "$2b$12$" + "x" * 53
+
+
+def timed(func) -> float:
+    """ Duration of `func` in seconds """
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def register_loop(auth: Auth, credentials: list):
+    """ One register_user call per user, duplicates included """
+    for email, password in credentials:
+        try:
+            auth.register_user(email, password)
+        except ValueError:
+            pass
+
+
+def add_loop(db: DB, rows: list):
+    """ One add_user call, hence one commit, per row """
+    for email, hashed_password in rows:
+        db.add_user(email, hashed_password)
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    # Whole path, bcrypt included: a tenant with 10% duplicated emails
+    credentials = [("user{}@bench.io".format(i % (users * 9 // 10)), "pwd")
+                   for i in range(users)]
+    loop = timed(lambda: register_loop(Auth(DB.in_memory()), credentials))
+    failures = {}
+    bulk = timed(lambda: failures.update(
+        Auth(DB.in_memory()).register_users(credentials)))
+    print("register {} users: loop {:.2f}s, bulk {:.2f}s, {} failures"
+          .format(users, loop, bulk, len(failures)))
+
+    # Database side only, with already hashed passwords
+    rows = [("row{}@bench.io".format(i), HASHED_PASSWORD)
+            for i in range(n_rows)]
+    loop = timed(lambda: add_loop(DB.in_memory(), rows))
+    bulk = timed(lambda: DB.in_memory().add_users_bulk(rows))
+    print("insert {} rows: loop {:.2f}s, bulk {:.2f}s"
+          .format(n_rows, loop, bulk))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test of the DB class: every worker thread registers and
+looks up its own users, then the table is checked for lost writes.
+
+Usage: python3 -m benchmarks.concurrency [OPS_PER_THREAD]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from db import DB
+from user import User
+
+HASHED_PASSWORD = "$2b$12$" + "x" * 53
+
+
+def worker(db: DB, prefix: str, ops: int) -> int:
+    """ Add then read back `ops` users, returns the number of mismatches """
+    errors = 0
+    try:
+        for i in range(ops):
+            email = "{}-{}@bench.io".format(prefix, i)
+            db.add_user(email, HASHED_PASSWORD)
+            if db.find_user_by(email=email).email != email:
+                errors += 1
+    finally:
+        db.remove_session()
+    return errors
+
+
+def reader(db: DB, prefix: str, ops: int) -> int:
+    """ Look up `ops` users, returns the number of misses """
+    errors = 0
+    try:
+        for i in range(ops):
+            email = "{}-{}@bench.io".format(prefix, i)
+            if db.find_user_by(email=email).email != email:
+                errors += 1
+    finally:
+        db.remove_session()
+    return errors
+
+
+def run(threads: int, ops: int) -> dict:
+    """ Run `threads` workers on a fresh database """
+    directory = tempfile.mkdtemp()
+    db = DB("sqlite:///{}".format(os.path.join(directory, "bench.db")),
+            pool_size=threads)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        errors = sum(pool.map(lambda t: worker(db, "t{}".format(t), ops),
+                              range(threads)))
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        errors += sum(pool.map(lambda t: reader(db, "t{}".format(t), ops),
+                               range(threads)))
+    read_elapsed = time.perf_counter() - start
+    rows = db._session.query(User).count()
+    db.remove_session()
+    db._engine.dispose()
+    shutil.rmtree(directory)
+    return {"threads": threads,
+            "writes_per_s": round(threads * ops / elapsed),
+            "reads_per_s": round(threads * ops / read_elapsed),
+            "errors": errors, "rows": rows, "expected": threads * ops}
+
+
+if __name__ == "__main__":
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for threads in (1, 2, 4, 8):
+        print(run(threads, ops))
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Latency of valid_login for known and unknown emails, with and without
+the constant-time check of unknown emails.
+
+Usage: python3 -m benchmarks.login_latency [LOGINS] [ROUNDS]
+"""
+import json
+import sys
+from auth import Auth
+from db import DB
+
+
+def run(constant_time: bool, logins: int, rounds: int) -> dict:
+    """ `logins` failed logins of each kind on a fresh database """
+    auth = Auth(DB.in_memory(), rounds=rounds,
+                constant_time_login=constant_time)
+    auth.register_user("known@bench.io", "password")
+    for _ in range(logins):
+        auth.valid_login("known@bench.io", "wrong")
+        auth.valid_login("unknown@bench.io", "wrong")
+    return auth.login_latency_stats()
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    for constant_time in (False, True):
+        print("constant_time={}: {}".format(
+            constant_time, json.dumps(run(constant_time, logins, rounds))))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Concurrent login load test against a running server, to compare the
+sync app (`python3 app.py`) with the async one (`hypercorn async_app:app`).
+
+Usage: python3 -m benchmarks.login_load URL [CONCURRENCY] [DURATION]
+"""
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+EMAIL = "load@bench.io"
+PASSWORD = "load-test-password"
+
+
+def post(url: str, data: dict) -> int:
+    """ POST a form, returns the status code """
+    try:
+        with urlopen(url, urlencode(data).encode()) as response:
+            response.read()
+            return response.status
+    except HTTPError as e:
+        return e.code
+
+
+def client(url: str, deadline: float, latencies: list, lock: threading.Lock):
+    """ Log in repeatedly until the deadline """
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        status = post(url + "/sessions",
+                      {"email": EMAIL, "password": PASSWORD})
+        with lock:
+            latencies.append((time.perf_counter() - start, status))
+
+
+def run(url: str, concurrency: int, duration: float) -> dict:
+    """ Run `concurrency` clients for `duration` seconds """
+    post(url + "/users", {"email": EMAIL, "password": PASSWORD})
+    latencies, lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client, url, deadline, latencies, lock)
+    ok = sorted(latency for latency, status in latencies if status == 200)
+    if not ok:
+        return {"logins_per_s": 0, "errors": len(latencies)}
+    return {
+        "concurrency": concurrency,
+        "logins_per_s": round(len(ok) / duration, 1),
+        "p50_ms": round(ok[len(ok) // 2] * 1000, 1),
+        "p99_ms": round(ok[int(len(ok) * 0.99)] * 1000, 1),
+        "errors": len(latencies) - len(ok),
+    }
+
+
+if __name__ == "__main__":
+    url = sys.argv[1].rstrip("/")
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    print(json.dumps(run(url, concurrency, duration)))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Registration and lookup timings on a large users table.
+
+Usage: python3 -m benchmarks.register_lookup [N]
+"""
+import sys
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from db import DB
+from user import User
+
+# Registration cost without bcrypt, which would dominate every timing
+HASHED_PASSWORD = "$2b$12$" + "x" * 53
+
+
+def seed(db: DB, n: int, chunk: int = 50000):
+    """ Insert `n` users with one executemany per chunk """
+    with db._engine.begin() as conn:
+        for start in range(0, n, chunk):
+            conn.execute(User.__table__.insert(), [
+                {"email": "user{}@bench.io".format(i),
+                 "hashed_password": HASHED_PASSWORD}
+                for i in range(start, min(start + chunk, n))])
+
+
+def timed(func, repeat: int) -> float:
+    """ Mean duration of `func` in microseconds """
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def duplicate(db: DB, i: int):
+    """ Insert an already registered email """
+    try:
+        db.add_user("user{}@bench.io".format(i), HASHED_PASSWORD)
+    except IntegrityError:
+        pass
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    db = DB.in_memory()
+    start = time.perf_counter()
+    seed(db, n)
+    print("seed {} rows: {:.1f}s".format(n, time.perf_counter() - start))
+
+    with db._engine.connect() as conn:
+        plan = conn.execute(text("EXPLAIN QUERY PLAN SELECT * FROM users "
+                                 "WHERE email = 'user1@bench.io'")).all()
+    print("plan:", plan[-1][-1])
+
+    print("register new:  {:.0f} us".format(timed(
+        lambda i: db.add_user("new{}@bench.io".format(i), HASHED_PASSWORD),
+        1000)))
+    print("register dup:  {:.0f} us".format(timed(
+        lambda i: duplicate(db, i * 997 % n), 1000)))
+    print("lookup hit:    {:.0f} us".format(timed(
+        lambda i: db.find_user_by(email="user{}@bench.io".format(
+            i * 7919 % n)), 1000)))
@@ -2,35 +2,195 @@
 """
 DB module
 """
-from sqlalchemy import create_engine
+import os
+from functools import lru_cache
+from threading import Lock
+from typing import Callable, Dict, FrozenSet, Iterable, List, Set, Tuple
+from sqlalchemy import (Column, Integer, Table, and_, bindparam, delete,
+                        create_engine, event, inspect, select, text)
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.exc import InvalidRequestError
-from user import Base, User
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from user import Base, ResetToken, User
+
+DEFAULT_DB_URL = "sqlite:///a.db"
+IN_MEMORY_DB_URL = "sqlite://"
+# Bound parameters per IN (...) query, under SQLite's historical limit
+MAX_IN_PARAMS = 900
+# Rows deleted per transaction when purging expired reset tokens
+PURGE_BATCH_SIZE = 1000
+
+schema_version = Table("schema_version", Base.metadata,
+                       Column("version", Integer, nullable=False))
+
+
+def _index_users(conn: Connection) -> None:
+    """Add the indexes of users to databases created before they existed
+    """
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email "
+                      "ON users (email)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_session_id "
+                      "ON users (session_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_reset_token "
+                      "ON users (reset_token)"))
+
+
+# Ordered (version, migration) pairs, applied to existing databases only:
+# new databases are created from the models and stamped with the last one
+MIGRATIONS: List[Tuple[int, Callable[[Connection], None]]] = [
+    (1, _index_users),
+    # Databases created at version 1 got a UNIQUE(email) constraint from
+    # the model instead of the ix_users_email index
+    (2, _index_users),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Lookups that the optional read cache of DB can answer
+CACHED_LOOKUP_KEYS = ("email", "session_id")
+
+
+def migrate(conn: Connection) -> None:
+    """Create the missing tables and apply the pending migrations
+
+    Only the table definitions and the schema version are read, so the
+    cost doesn't depend on the number of rows.
+    """
+    is_new = not inspect(conn).has_table(User.__tablename__)
+    Base.metadata.create_all(conn)  # Only the missing tables
+    stored = conn.execute(schema_version.select()).scalar()
+    if stored is None:
+        stored = SCHEMA_VERSION if is_new else 0
+        conn.execute(schema_version.insert().values(version=stored))
+    version = stored
+    for migration_version, migration in MIGRATIONS:
+        if migration_version > version:
+            migration(conn)
+            version = migration_version
+    if version != stored:
+        conn.execute(schema_version.update().values(version=version))
+
+
+@lru_cache(maxsize=None)
+def _column_names(model: type) -> FrozenSet[str]:
+    """Names of the mapped columns of a model, computed once per model
+    """
+    return frozenset(column.key for column in inspect(model).column_attrs)
+
+
+@lru_cache(maxsize=64)
+def _select_by(model: type,
+               keys: Tuple[Tuple[str, bool], ...]) -> Select:
+    """SELECT of the first row matching the given (column, is None) pairs,
+    built once per combination so SQLAlchemy reuses its compiled form
+
+    None values compare with IS NULL, as `filter_by` does, since
+    `column = NULL` is never true.
+    """
+    return select(model).where(and_(*[
+        getattr(model, key).is_(None) if is_none
+        else getattr(model, key) == bindparam(f"p_{key}")
+        for key, is_none in keys
+    ])).limit(1)
+
+
+def _lookup(model: type, kwargs: Dict) -> Tuple[Select, Dict]:
+    """SELECT of the first row matching `kwargs`, and its parameters
+    """
+    keys = tuple(sorted((key, value is None) for key, value in
+                        kwargs.items()))
+    return _select_by(model, keys), {
+        f"p_{key}": kwargs[key] for key, is_none in keys if not is_none}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Enable WAL on every new SQLite connection, so that readers don't
+    block the writer and the other way around
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
 
 
 class DB:
     """DB class for handling database operations
+
+    Sessions are scoped to the calling thread: each request thread gets
+    its own, released with `remove_session` when the request ends.
     """
 
-    def __init__(self) -> None:
-        """Initialize a new DB instance and setup database schema
+    def __init__(self, url: str = None, echo: bool = None,
+                 pool_size: int = 5, max_overflow: int = 10,
+                 read_cache: bool = False) -> None:
+        """Initialize a new DB instance and bring its schema up to date,
+        keeping the existing data
+
+        Args:
+            url (str): Database URL, defaults to the DB_URL environment
+                variable or sqlite:///a.db
+            echo (bool): Log the SQL statements, defaults to the DB_ECHO
+                environment variable
+            pool_size (int): Connections kept open in the pool
+            max_overflow (int): Extra connections opened under load
+            read_cache (bool): Remember the ID of the users found by
+                email or session_id, until they are updated
+        """
+        if url is None:
+            url = os.getenv("DB_URL", DEFAULT_DB_URL)
+        if echo is None:
+            echo = os.getenv("DB_ECHO", "").lower() in ("1", "true", "yes")
+        is_sqlite = url.startswith("sqlite")
+        in_memory = url in (IN_MEMORY_DB_URL, "sqlite:///:memory:")
+        options = {}
+        if is_sqlite:
+            # Pooled connections move between threads, never concurrently
+            options["connect_args"] = {"check_same_thread": False,
+                                       "timeout": 30}
+        if in_memory:
+            # One connection shared by every thread, or each gets its own
+            # empty database
+            options["poolclass"] = StaticPool
+        else:
+            options.update(poolclass=QueuePool, pool_size=pool_size,
+                           max_overflow=max_overflow)
+        self._engine = create_engine(url, echo=echo, **options)
+        if is_sqlite and not in_memory:
+            event.listen(self._engine, "connect", _set_sqlite_pragmas)
+        self._migrate()
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
+        self._read_cache = {} if read_cache else None
+        self._cache_keys_by_id: Dict[int, Set[Tuple[str, str]]] = {}
+        self._cache_lock = Lock()
+
+    @classmethod
+    def in_memory(cls, echo: bool = False) -> "DB":
+        """Create a DB living in memory, for tests and benchmarks
+        """
+        return cls(IN_MEMORY_DB_URL, echo=echo)
+
+    def _migrate(self) -> None:
+        """Bring the schema up to date in one transaction
         """
-        self._engine = create_engine("sqlite:///a.db", echo=True)
-        Base.metadata.drop_all(self._engine)  # Clear the DB
-        Base.metadata.create_all(self._engine)  # Create tables
-        self.__session = None
+        with self._engine.begin() as conn:
+            migrate(conn)
 
     @property
     def _session(self) -> Session:
-        """Memoized session object to handle database transactions
+        """Session object of the current thread to handle database
+        transactions
+        """
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """Close the session of the current thread and give its connection
+        back to the pool
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """Add a user to the database
@@ -41,13 +201,100 @@ class DB:
 
         Returns:
             User: The created User object
+
+        Raises:
+            IntegrityError: If a user with the same email already exists
         """
         new_user = User(email=email, hashed_password=hashed_password)
         session = self._session
         session.add(new_user)
-        session.commit()
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            raise
+        self._invalidate(new_user.id)
         return new_user
 
+    def find_existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        """Return the given emails that are already registered
+
+        Args:
+            emails (Iterable[str]): The emails to look for
+
+        Returns:
+            Set[str]: The registered ones, found with one indexed
+            IN (...) query per MAX_IN_PARAMS emails
+        """
+        emails = list(emails)
+        existing = set()
+        with self._engine.connect() as conn:
+            for start in range(0, len(emails), MAX_IN_PARAMS):
+                chunk = emails[start:start + MAX_IN_PARAMS]
+                existing.update(conn.execute(
+                    select(User.email).where(User.email.in_(chunk)))
+                    .scalars())
+        return existing
+
+    def add_users_bulk(self, users: Iterable[Tuple[str, str]],
+                       chunk_size: int = 1000) -> Dict[int, str]:
+        """Add many users, one executemany INSERT and one transaction per
+        chunk
+
+        Args:
+            users (Iterable[Tuple[str, str]]): (email, hashed_password)
+                pairs
+            chunk_size (int): Users inserted per transaction
+
+        Returns:
+            Dict[int, str]: Error message of each user that couldn't be
+            added, by position in `users`
+        """
+        failures = {}
+        chunk = []
+        for index, (email, hashed_password) in enumerate(users):
+            chunk.append((index, email, hashed_password))
+            if len(chunk) == chunk_size:
+                failures.update(self._insert_chunk(chunk))
+                chunk = []
+        if chunk:
+            failures.update(self._insert_chunk(chunk))
+        return failures
+
+    def _insert_chunk(self, chunk: List[Tuple[int, str, str]]
+                      ) -> Dict[int, str]:
+        """Insert one chunk of `add_users_bulk` in a single transaction,
+        leaving out the duplicated emails
+        """
+        failures = {}
+        existing = self.find_existing_emails(email for _, email, _ in chunk)
+        rows = []
+        for index, email, hashed_password in chunk:
+            if email in existing:
+                failures[index] = f"User {email} already exists"
+                continue
+            existing.add(email)
+            rows.append({"email": email, "hashed_password": hashed_password})
+        if not rows:
+            return failures
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(User.__table__.insert(), rows)
+        except IntegrityError:
+            # Registered concurrently since the check: retry row by row
+            # to find out which ones
+            for index, email, hashed_password in chunk:
+                if index in failures:
+                    continue
+                try:
+                    with self._engine.begin() as conn:
+                        conn.execute(User.__table__.insert(), {
+                            "email": email,
+                            "hashed_password": hashed_password})
+                except IntegrityError as e:
+                    failures[index] = f"Can't add user {email}: {e.orig}"
+        return failures
+
     def find_user_by(self, **kwargs) -> User:
         """Find a user by arbitrary keyword arguments
 
@@ -61,40 +308,152 @@ class DB:
             NoResultFound: If no user is found
             InvalidRequestError: If invalid query arguments are passed
         """
+        columns = _column_names(User)
+        for key in kwargs:
+            if key not in columns:
+                raise InvalidRequestError(
+                    f"Invalid request: {key} is not a column of User")
+
         session = self._session
+        cache_key = None
+        if self._read_cache is not None and len(kwargs) == 1:
+            cache_key = next(iter(kwargs.items()))
+            if cache_key[0] not in CACHED_LOOKUP_KEYS or \
+                    cache_key[1] is None:
+                cache_key = None
+        if cache_key is not None:
+            user_id = self._read_cache.get(cache_key)
+            if user_id is not None:
+                # Primary key lookup, answered by the identity map when the
+                # user is already in the session
+                user = session.get(User, user_id)
+                if user is not None and \
+                        getattr(user, cache_key[0]) == cache_key[1]:
+                    return user
+
         try:
-            user = session.query(User).filter_by(**kwargs).first()
-            if user is None:
-                raise NoResultFound
-            return user
-        except NoResultFound:
-            raise NoResultFound("No user found with the provided filters.")
+            user = session.execute(*_lookup(User, kwargs)).scalars().first()
         except Exception as e:
             raise InvalidRequestError(f"Invalid request: {e}")
+        if user is None:
+            raise NoResultFound("No user found with the provided filters.")
+        if cache_key is not None:
+            with self._cache_lock:
+                self._read_cache[cache_key] = user.id
+                self._cache_keys_by_id.setdefault(user.id, set()).add(
+                    cache_key)
+        return user
+
+    def _invalidate(self, user_id: int) -> None:
+        """Forget the cached lookups of a user
+        """
+        if self._read_cache is None:
+            return
+        with self._cache_lock:
+            for cache_key in self._cache_keys_by_id.pop(user_id, ()):
+                self._read_cache.pop(cache_key, None)
 
-    def update_user(self, user_id: int, **kwargs) -> None:
-        """Update a user’s attributes
+    def update_user(self, user_id: int, **kwargs) -> int:
+        """Update a user’s attributes with a single UPDATE statement,
+        without loading the user
 
         Args:
             user_id (int): The ID of the user to update
             kwargs: Arbitrary keyword arguments of attributes to update
 
         Returns:
-            None
+            int: The number of updated rows
 
         Raises:
             ValueError: If any argument does not correspond to a user attribute
+            NoResultFound: If no user has this ID
         """
+        columns = _column_names(User)
+        for key in kwargs:
+            if key not in columns:
+                raise ValueError(f"{key} is not a valid attribute of User")
+
         session = self._session
+        if not kwargs:
+            # Nothing to write, only check that the user exists
+            if session.query(User.id).filter(User.id == user_id).first() \
+                    is None:
+                raise NoResultFound("No user found with the provided filters.")
+            return 0
 
-        # Find the user by ID
-        user = self.find_user_by(id=user_id)
+        # "evaluate" keeps the users already loaded in the session in sync
+        # without selecting them again
+        count = session.query(User).filter(User.id == user_id).update(
+            kwargs, synchronize_session="evaluate")
+        session.commit()
+        self._invalidate(user_id)
+        if count == 0:
+            raise NoResultFound("No user found with the provided filters.")
+        return count
 
-        # Update the user's attributes
-        for key, value in kwargs.items():
-            if not hasattr(user, key):
-                raise ValueError(f"{key} is not a valid attribute of User")
-            setattr(user, key, value)
+    def add_reset_token(self, user_id: int, token_hash: str,
+                        expires_at: int) -> None:
+        """Store a reset token of a user, replacing the previous ones
 
-        # Commit the changes to the database
-        session.commit()
+        Args:
+            user_id (int): The ID of the user
+            token_hash (str): SHA-256 hex digest of the token
+            expires_at (int): Expiry time, in epoch seconds
+        """
+        with self._engine.begin() as conn:
+            conn.execute(delete(ResetToken)
+                         .where(ResetToken.user_id == user_id))
+            conn.execute(ResetToken.__table__.insert(), {
+                "token_hash": token_hash, "user_id": user_id,
+                "expires_at": expires_at})
+
+    def consume_reset_token(self, token_hash: str, now: int) -> int:
+        """Delete a valid reset token and return its user
+
+        Args:
+            token_hash (str): SHA-256 hex digest of the token
+            now (int): Current time, in epoch seconds
+
+        Returns:
+            int: The ID of the user of the token
+
+        Raises:
+            NoResultFound: If the token doesn't exist, has expired or was
+                used concurrently
+        """
+        with self._engine.begin() as conn:
+            user_id = conn.execute(
+                select(ResetToken.user_id).where(
+                    ResetToken.token_hash == token_hash,
+                    ResetToken.expires_at > now)).scalar()
+            if user_id is not None:
+                deleted = conn.execute(
+                    delete(ResetToken)
+                    .where(ResetToken.token_hash == token_hash)).rowcount
+                if deleted == 1:
+                    return user_id
+        raise NoResultFound("No valid reset token found.")
+
+    def purge_expired_reset_tokens(self, now: int,
+                                   batch_size: int = PURGE_BATCH_SIZE) -> int:
+        """Delete the expired reset tokens, at most `batch_size` per
+        transaction so that the write lock is only held briefly
+
+        Args:
+            now (int): Current time, in epoch seconds
+            batch_size (int): Rows deleted per transaction
+
+        Returns:
+            int: The number of deleted tokens
+        """
+        expired = select(ResetToken.token_hash).where(
+            ResetToken.expires_at <= now).limit(batch_size)
+        total = 0
+        while True:
+            with self._engine.begin() as conn:
+                deleted = conn.execute(
+                    delete(ResetToken)
+                    .where(ResetToken.token_hash.in_(expired))).rowcount
+            total += deleted
+            if deleted < batch_size:
+                return total
@@ -3,10 +3,11 @@
 Main file
 """
 from auth import Auth
+from db import DB
 
 email = 'bob@bob.com'
 password = 'MyPwdOfBob'
-auth = Auth()
+auth = Auth(DB.in_memory())
 
 auth.register_user(email, password)
 
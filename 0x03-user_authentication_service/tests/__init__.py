@@ -0,0 +1,3 @@
+#!/usr/bin/env python3
+"""Unit tests of the user authentication service
+"""
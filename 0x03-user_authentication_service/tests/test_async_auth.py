@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Tests of the session lifecycle of AsyncAuth
+"""
+import unittest
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+from async_auth import AsyncAuth
+from async_db import AsyncDB
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+class TestAsyncSessions(unittest.IsolatedAsyncioTestCase):
+    """Tests of create_session, get_user_from_session_id and
+    destroy_session
+    """
+
+    async def asyncSetUp(self):
+        """A registered user, with and without the session cache
+        """
+        self.auths = []
+        for ttl in (60, 0):
+            auth = AsyncAuth(AsyncDB.in_memory(), rounds=4,
+                             session_cache_ttl=ttl)
+            await auth.setup()
+            await auth.register_user("bob@hbtn.io", "pwd")
+            self.auths.append(auth)
+
+    async def asyncTearDown(self):
+        """Close the databases
+        """
+        for auth in self.auths:
+            await auth._db.close()
+
+    async def test_lifecycle(self):
+        """A session finds its user until it is destroyed
+        """
+        for auth in self.auths:
+            with self.subTest(ttl=auth._sessions._ttl):
+                session_id = await auth.create_session("bob@hbtn.io")
+                user = await auth.get_user_from_session_id(session_id)
+                self.assertEqual(user.email, "bob@hbtn.io")
+                stored = await auth._db.find_user_by(email="bob@hbtn.io")
+                self.assertEqual(stored.session_id, session_id)
+
+                await auth.destroy_session(user.id)
+                self.assertIsNone(
+                    await auth.get_user_from_session_id(session_id))
+                stored = await auth._db.find_user_by(email="bob@hbtn.io")
+                self.assertIsNone(stored.session_id)
+
+    async def test_new_session(self):
+        """A new session replaces the previous one
+        """
+        auth = self.auths[0]
+        first = await auth.create_session("bob@hbtn.io")
+        second = await auth.create_session("bob@hbtn.io")
+        self.assertIsNone(await auth.get_user_from_session_id(first))
+        self.assertIsNotNone(await auth.get_user_from_session_id(second))
+
+    async def test_unknown(self):
+        """Unknown emails, sessions and users are ignored
+        """
+        auth = self.auths[0]
+        self.assertIsNone(await auth.create_session("amy@hbtn.io"))
+        self.assertIsNone(await auth.get_user_from_session_id(None))
+        self.assertIsNone(await auth.get_user_from_session_id("nope"))
+        await auth.destroy_session(None)
+        await auth.destroy_session(42)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Tests of the schema migrations of the database
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from sqlalchemy import inspect, text
+from db import DB, SCHEMA_VERSION, schema_version
+
+# Schema of the databases created before the migrations
+OLD_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL,
+    email VARCHAR(250) NOT NULL,
+    hashed_password VARCHAR(250) NOT NULL,
+    session_id VARCHAR(250),
+    reset_token VARCHAR(250),
+    PRIMARY KEY (id)
+)
+"""
+
+
+# Indexes of users, by name, whatever the history of the database
+USERS_INDEXES = {"ix_users_email": 1, "ix_users_session_id": 0,
+                 "ix_users_reset_token": 0}
+
+
+def users_indexes(db: DB) -> dict:
+    """Whether each index of users is unique, by name
+    """
+    return {index["name"]: index["unique"]
+            for index in inspect(db._engine).get_indexes("users")}
+
+
+def stored_version(db: DB) -> int:
+    """Schema version stamped in a database
+    """
+    with db._engine.connect() as conn:
+        return conn.execute(schema_version.select()).scalar()
+
+
+class TestMigrate(unittest.TestCase):
+    """Tests of migrate
+    """
+
+    def setUp(self):
+        """Temporary directory of the database files
+        """
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "a.db")
+
+    def tearDown(self):
+        """Remove the database files
+        """
+        shutil.rmtree(self.tmp_dir)
+
+    def open(self) -> DB:
+        """DB of the temporary file, disposed of after the test
+        """
+        db = DB(f"sqlite:///{self.path}")
+        self.addCleanup(db._engine.dispose)
+        return db
+
+    def test_old_database(self):
+        """An unversioned database is migrated, keeping its rows
+        """
+        conn = sqlite3.connect(self.path)
+        conn.execute(OLD_SCHEMA)
+        conn.execute("INSERT INTO users (email, hashed_password, session_id)"
+                     " VALUES ('bob@hbtn.io', 'hash', 'sid')")
+        conn.commit()
+        conn.close()
+
+        db = self.open()
+        user = db.find_user_by(email="bob@hbtn.io")
+        self.assertEqual((user.hashed_password, user.session_id),
+                         ("hash", "sid"))
+        self.assertEqual(users_indexes(db), USERS_INDEXES)
+        self.assertTrue(inspect(db._engine).has_table("reset_tokens"))
+        self.assertEqual(stored_version(db), SCHEMA_VERSION)
+
+    def test_version_1(self):
+        """A database created with UNIQUE(email) gets ix_users_email
+        """
+        conn = sqlite3.connect(self.path)
+        conn.execute(OLD_SCHEMA.replace("PRIMARY KEY (id)",
+                                        "PRIMARY KEY (id), UNIQUE (email)"))
+        conn.execute("CREATE TABLE schema_version (version INTEGER NOT NULL)")
+        conn.execute("INSERT INTO schema_version VALUES (1)")
+        conn.commit()
+        conn.close()
+
+        db = self.open()
+        self.assertEqual(users_indexes(db), USERS_INDEXES)
+        self.assertEqual(stored_version(db), SCHEMA_VERSION)
+
+    def test_reopen(self):
+        """Migrating an up to date database changes nothing
+        """
+        db = self.open()
+        db.add_user("bob@hbtn.io", "hash")
+        db.remove_session()
+        db._engine.dispose()
+
+        db = self.open()
+        self.assertEqual(db.find_user_by(email="bob@hbtn.io").id, 1)
+        self.assertEqual(stored_version(db), SCHEMA_VERSION)
+        with db._engine.connect() as conn:
+            self.assertEqual(conn.execute(
+                text("SELECT COUNT(*) FROM schema_version")).scalar(), 1)
+
+    def test_new_database(self):
+        """A new database has the indexes of a migrated one, and is
+        stamped with the last version
+        """
+        db = DB.in_memory()
+        self.assertEqual(users_indexes(db), USERS_INDEXES)
+        self.assertEqual(stored_version(db), SCHEMA_VERSION)
+
+
+if __name__ == "__main__":
+    unittest.main()
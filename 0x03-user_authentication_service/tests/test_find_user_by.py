@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Tests of the lookups of DB.find_user_by
+"""
+import unittest
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm.exc import NoResultFound
+from db import DB
+
+
+class TestFindUserBy(unittest.TestCase):
+    """Tests of find_user_by, with and without the read cache
+    """
+
+    def setUp(self):
+        """Two users, the second one logged in
+        """
+        self.dbs = [DB.in_memory(), DB("sqlite://", read_cache=True)]
+        for db in self.dbs:
+            db.add_user("bob@hbtn.io", "hash")
+            user = db.add_user("amy@hbtn.io", "hash")
+            db.update_user(user.id, session_id="sid")
+
+    def test_values(self):
+        """Users are found by one or several columns
+        """
+        for db in self.dbs:
+            with self.subTest(db=db):
+                self.assertEqual(db.find_user_by(session_id="sid").email,
+                                 "amy@hbtn.io")
+                self.assertEqual(db.find_user_by(
+                    email="bob@hbtn.io", hashed_password="hash").id, 1)
+                with self.assertRaises(NoResultFound):
+                    db.find_user_by(email="bob@hbtn.io", session_id="sid")
+
+    def test_none(self):
+        """None values match NULL columns
+        """
+        for db in self.dbs:
+            with self.subTest(db=db):
+                self.assertEqual(db.find_user_by(session_id=None).email,
+                                 "bob@hbtn.io")
+                self.assertEqual(db.find_user_by(
+                    email="amy@hbtn.io", reset_token=None).id, 2)
+                with self.assertRaises(NoResultFound):
+                    db.find_user_by(email="amy@hbtn.io", session_id=None)
+                # The compiled SELECT of a column depends on the value
+                self.assertEqual(db.find_user_by(session_id="sid").id, 2)
+
+    def test_invalid(self):
+        """Unknown columns are rejected
+        """
+        with self.assertRaises(InvalidRequestError):
+            self.dbs[0].find_user_by(name="bob")
+
+
+if __name__ == "__main__":
+    unittest.main()
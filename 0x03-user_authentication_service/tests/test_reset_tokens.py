@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Tests of the password reset tokens
+"""
+import time
+import unittest
+from unittest import mock
+from sqlalchemy import func, select
+from sqlalchemy.orm.exc import NoResultFound
+from auth import Auth, _hash_token
+from db import DB
+from user import ResetToken
+
+
+def count_tokens(db: DB) -> int:
+    """Number of stored reset tokens
+    """
+    with db._engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(
+            ResetToken)).scalar()
+
+
+class TestResetTokenTable(unittest.TestCase):
+    """Tests of the reset token methods of DB
+    """
+
+    def setUp(self):
+        """Two users
+        """
+        self.db = DB.in_memory()
+        self.bob = self.db.add_user("bob@hbtn.io", "hash").id
+        self.amy = self.db.add_user("amy@hbtn.io", "hash").id
+
+    def test_single_use(self):
+        """A token is consumed once, before its expiry only
+        """
+        self.db.add_reset_token(self.bob, "t1", expires_at=100)
+        with self.assertRaises(NoResultFound):
+            self.db.consume_reset_token("t1", now=100)
+        self.assertEqual(self.db.consume_reset_token("t1", now=99),
+                         self.bob)
+        with self.assertRaises(NoResultFound):
+            self.db.consume_reset_token("t1", now=99)
+        with self.assertRaises(NoResultFound):
+            self.db.consume_reset_token("unknown", now=0)
+
+    def test_replaced(self):
+        """A new token of a user replaces the previous one
+        """
+        self.db.add_reset_token(self.bob, "t1", expires_at=100)
+        self.db.add_reset_token(self.amy, "t2", expires_at=100)
+        self.db.add_reset_token(self.bob, "t3", expires_at=100)
+        with self.assertRaises(NoResultFound):
+            self.db.consume_reset_token("t1", now=0)
+        self.assertEqual(self.db.consume_reset_token("t2", now=0), self.amy)
+        self.assertEqual(self.db.consume_reset_token("t3", now=0), self.bob)
+
+    def test_purge(self):
+        """Expired tokens are deleted in batches, the others are kept
+        """
+        for i in range(25):
+            user_id = self.db.add_user(f"u{i}@hbtn.io", "hash").id
+            self.db.add_reset_token(user_id, f"old{i}", expires_at=i)
+        self.db.add_reset_token(self.bob, "new", expires_at=1000)
+        self.assertEqual(
+            self.db.purge_expired_reset_tokens(now=24, batch_size=10), 25)
+        self.assertEqual(count_tokens(self.db), 1)
+        self.assertEqual(self.db.purge_expired_reset_tokens(now=24), 0)
+        self.assertEqual(self.db.consume_reset_token("new", now=24),
+                         self.bob)
+
+
+class TestResetPassword(unittest.TestCase):
+    """Tests of get_reset_password_token and update_password
+    """
+
+    def setUp(self):
+        """A registered user
+        """
+        self.auth = Auth(DB.in_memory(), rounds=4, reset_token_ttl=900)
+        self.auth.register_user("bob@hbtn.io", "old")
+
+    def test_update_password(self):
+        """A token sets the password once, and is stored hashed
+        """
+        token = self.auth.get_reset_password_token("bob@hbtn.io")
+        with self.auth._db._engine.connect() as conn:
+            self.assertEqual(conn.execute(select(ResetToken.token_hash))
+                             .scalar(), _hash_token(token))
+        self.auth.update_password(token, "new")
+        self.assertTrue(self.auth.valid_login("bob@hbtn.io", "new"))
+        self.assertFalse(self.auth.valid_login("bob@hbtn.io", "old"))
+        with self.assertRaises(ValueError):
+            self.auth.update_password(token, "newer")
+
+    def test_expired(self):
+        """Tokens expire after reset_token_ttl seconds
+        """
+        token = self.auth.get_reset_password_token("bob@hbtn.io")
+        with mock.patch.object(time, "time", return_value=time.time() + 900):
+            with self.assertRaises(ValueError):
+                self.auth.update_password(token, "new")
+            self.assertEqual(self.auth.purge_expired_reset_tokens(), 1)
+
+    def test_missing_arguments(self):
+        """A missing password doesn't consume the token
+        """
+        token = self.auth.get_reset_password_token("bob@hbtn.io")
+        for reset_token, password in ((token, None), (token, ""),
+                                      (None, "new"), ("", "new")):
+            with self.assertRaises(ValueError):
+                self.auth.update_password(reset_token, password)
+        self.auth.update_password(token, "new")
+        with self.assertRaises(ValueError):
+            self.auth.get_reset_password_token("amy@hbtn.io")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Tests of the session lifecycle of Auth and its session cache
+"""
+import time
+import unittest
+from unittest import mock
+from auth import Auth, _SessionCache
+from db import DB
+from user import User
+
+
+def make_user(user_id: int) -> User:
+    """User bound to no session
+    """
+    return User(id=user_id, email=f"user{user_id}@hbtn.io",
+                hashed_password="hash")
+
+
+class TestSessionCache(unittest.TestCase):
+    """Tests of _SessionCache
+    """
+
+    def test_put_get(self):
+        """A user is cached under its last session only
+        """
+        cache = _SessionCache(60)
+        user = make_user(1)
+        cache.put("a", user)
+        self.assertIs(cache.get("a"), user)
+        cache.put("b", user)
+        self.assertIsNone(cache.get("a"))
+        self.assertIs(cache.get("b"), user)
+        self.assertIsNone(cache.get("c"))
+
+    def test_ttl(self):
+        """Entries expire after the TTL, and 0 disables the cache
+        """
+        cache = _SessionCache(60)
+        with mock.patch.object(time, "monotonic", return_value=1000):
+            cache.put("a", make_user(1))
+        with mock.patch.object(time, "monotonic", return_value=1059.9):
+            self.assertIsNotNone(cache.get("a"))
+        with mock.patch.object(time, "monotonic", return_value=1060):
+            self.assertIsNone(cache.get("a"))
+        # An expiry isn't a logout: the session can be cached again
+        epoch = cache.epoch()
+        cache.put("a", make_user(1), since=epoch)
+        self.assertIsNotNone(cache.get("a"))
+
+        cache = _SessionCache(0)
+        cache.put("a", make_user(1))
+        self.assertIsNone(cache.get("a"))
+
+    def test_tombstones(self):
+        """A lookup started before a discard doesn't cache the session
+        """
+        cache = _SessionCache(60)
+        epoch = cache.epoch()
+        cache.discard(1)
+        cache.put("a", make_user(1), since=epoch)
+        self.assertIsNone(cache.get("a"))
+        # Other users, and lookups started after the discard, are cached
+        cache.put("b", make_user(2), since=epoch)
+        self.assertIsNotNone(cache.get("b"))
+        cache.put("a", make_user(1), since=cache.epoch())
+        self.assertIsNotNone(cache.get("a"))
+
+    def test_pruned_tombstones(self):
+        """Past max_size, pruned tombstones still reject older lookups
+        """
+        cache = _SessionCache(60, max_size=2)
+        epoch = cache.epoch()
+        for user_id in (1, 2, 3):
+            cache.discard(user_id)
+        self.assertNotIn(1, cache._tombstones)
+        cache.put("a", make_user(1), since=epoch)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", make_user(1), since=cache.epoch())
+        self.assertIsNotNone(cache.get("a"))
+
+    def test_max_size(self):
+        """The oldest sessions are evicted past max_size
+        """
+        cache = _SessionCache(60, max_size=2)
+        for user_id in (1, 2, 3):
+            cache.put(f"s{user_id}", make_user(user_id))
+        self.assertIsNone(cache.get("s1"))
+        self.assertIsNotNone(cache.get("s3"))
+        self.assertNotIn(1, cache._session_by_user)
+
+
+class TestAuthSessions(unittest.TestCase):
+    """Tests of create_session, get_user_from_session_id and
+    destroy_session
+    """
+
+    def setUp(self):
+        """A registered user
+        """
+        self.auth = Auth(DB.in_memory(), rounds=4, session_cache_ttl=60)
+        self.user = self.auth.register_user("bob@hbtn.io", "pwd")
+
+    def test_lifecycle(self):
+        """A session finds its user until it is destroyed
+        """
+        session_id = self.auth.create_session("bob@hbtn.io")
+        self.assertEqual(
+            self.auth.get_user_from_session_id(session_id).id, self.user.id)
+        self.auth.destroy_session(self.user.id)
+        self.assertIsNone(self.auth.get_user_from_session_id(session_id))
+        self.assertIsNone(
+            self.auth._db.find_user_by(id=self.user.id).session_id)
+        self.assertIsNone(self.auth.create_session("amy@hbtn.io"))
+
+    def test_logout_during_lookup(self):
+        """A logout between the read of the row and the caching of a
+        lookup ends the session
+        """
+        session_id = self.auth.create_session("bob@hbtn.io")
+        # Not cached, so the lookup reads the row
+        self.auth._sessions = _SessionCache(60)
+        find_user_by = self.auth._db.find_user_by
+
+        def read_then_logout(**kwargs):
+            """Reads the row, then lets a logout run"""
+            user = find_user_by(**kwargs)
+            stale = make_user(user.id)
+            stale.session_id = user.session_id
+            self.auth.destroy_session(user.id)
+            return stale
+
+        with mock.patch.object(self.auth._db, "find_user_by",
+                               side_effect=read_then_logout):
+            self.assertIsNotNone(
+                self.auth.get_user_from_session_id(session_id))
+        self.assertIsNone(self.auth.get_user_from_session_id(session_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
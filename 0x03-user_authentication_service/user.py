@@ -2,7 +2,7 @@
 """
 User model definition
 """
-from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -15,10 +15,23 @@ class User(Base):
     __tablename__ = 'users'
 
     id = Column(Integer, primary_key=True)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, unique=True, index=True)
     hashed_password = Column(String(250), nullable=False)
-    session_id = Column(String(250), nullable=True)
-    reset_token = Column(String(250), nullable=True)
+    session_id = Column(String(250), nullable=True, index=True)
+    reset_token = Column(String(250), nullable=True, index=True)
+
+
+class ResetToken(Base):
+    """
+    ResetToken class that represents the reset_tokens table: password
+    reset tokens, stored as SHA-256 hashes, with their expiry time
+    """
+    __tablename__ = 'reset_tokens'
+
+    token_hash = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False,
+                     index=True)
+    expires_at = Column(Integer, nullable=False, index=True)
 
 
 # If you want to test the model with the code you provided: